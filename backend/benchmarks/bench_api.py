@@ -0,0 +1,113 @@
+"""
+End-to-end /api/analyze latency under concurrent load, served in-process
+through httpx's ASGI transport with recorded scraper fixtures and a stubbed
+Supabase. Each request uses a distinct query, so nothing is served from
+the query cache.
+
+    python -m benchmarks.bench_api --requests 200 --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks import offline
+
+offline.configure()
+
+
+def _percentile(sorted_values, pct):
+    import numpy as np
+
+    return float(np.percentile(sorted_values, pct))
+
+
+async def _load(app, requests, concurrency, authenticated, label="run"):
+    import httpx
+    from jose import jwt
+    from middleware.auth_middleware import JWT_ALGORITHM, JWT_SECRET
+
+    headers = {}
+    if authenticated:
+        token = jwt.encode({"sub": "benchmark-user", "exp": int(time.time()) + 3600}, JWT_SECRET, algorithm=JWT_ALGORITHM)
+        headers["Authorization"] = f"Bearer {token}"
+
+    latencies = []
+    failures = 0
+    counter = iter(range(requests))
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120) as client:
+
+        async def worker():
+            nonlocal failures
+            for i in counter:
+                started = time.perf_counter()
+                response = await client.post("/api/analyze", json={"query": f"acme {label} {i}"}, headers=headers)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    failures += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return sorted(latencies), failures, elapsed
+
+
+async def _run(requests, concurrency, warmup, authenticated, scrape_latency_ms, db_latency_ms):
+    import main
+    from services import sentiment_analysis
+
+    offline.install_supabase_stub(db_latency_ms)
+    offline.install_fixtures(scrape_latency_ms)
+    await main.app.router.startup()
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, sentiment_analysis.warmup_model)
+        if warmup:
+            await _load(main.app, warmup, concurrency, authenticated, label="warmup")
+        return await _load(main.app, requests, concurrency, authenticated)
+    finally:
+        await main.app.router.shutdown()
+
+
+def run(requests=200, concurrency=16, warmup=20, authenticated=True, scrape_latency_ms=0.0, db_latency_ms=5.0):
+    latencies, failures, elapsed = asyncio.run(
+        _run(requests, concurrency, warmup, authenticated, scrape_latency_ms, db_latency_ms)
+    )
+    prefix = f"api.analyze.c{concurrency}"
+    results = {
+        f"{prefix}.p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        f"{prefix}.p90_ms": round(_percentile(latencies, 90) * 1000, 2),
+        f"{prefix}.p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+        f"{prefix}.max_ms": round(latencies[-1] * 1000, 2),
+        f"{prefix}.requests_per_s": round(len(latencies) / elapsed, 2),
+        f"{prefix}.failures": failures,
+    }
+    for key, value in results.items():
+        print(f"{key:<40} {value}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests before measuring")
+    parser.add_argument("--anonymous", action="store_true", help="send no bearer token (skips the DB save)")
+    parser.add_argument("--scrape-latency-ms", type=float, default=0.0, help="artificial delay per fixture response")
+    parser.add_argument("--db-latency-ms", type=float, default=5.0, help="artificial delay per stubbed Supabase call")
+    args = parser.parse_args()
+
+    results = run(
+        requests=args.requests,
+        concurrency=args.concurrency,
+        warmup=args.warmup,
+        authenticated=not args.anonymous,
+        scrape_latency_ms=args.scrape_latency_ms,
+        db_latency_ms=args.db_latency_ms,
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Micro-benchmark for services.categorizer against the previous per-call
+implementation. Checks both agree on every article, then reports throughput.
+
+    python -m benchmarks.bench_categorizer --articles 5000
+"""
+import argparse
+import random
+import re
+import time
+
+from services.categorizer import categorize_articles
+
+WORDS = [
+    "acme", "corp", "announces", "merger", "with", "global", "bank", "cloud", "software",
+    "retail", "chain", "acquires", "stake", "in", "startup", "deal", "talks", "stall",
+    "investors", "fashion", "brand", "takeover", "bid", "rejected", "fintech", "platform",
+    "shares", "rise", "after", "buys out", "rival", "grocery", "telecom", "it ", "quarterly",
+    "results", "semiconductor", "maker", "combines with", "insurance", "group", "food",
+]
+
+
+def legacy_categorize_article(title, description):
+    title_lower = title.lower() if title else ""
+    desc_lower = description.lower() if description else ""
+    text = f"{title_lower} {desc_lower}"
+
+    categories = {
+        "technology": ["tech", "software", "digital", "cloud", "online", "internet", "ai",
+                      "artificial intelligence", "saas", "platform", "app", "semiconductor",
+                      "computing", "cybersecurity", "data", "it ", "telecom"],
+        "finance": ["bank", "financ", "invest", "capital", "fund", "asset", "wealth",
+                   "insurance", "loan", "credit", "payment", "fintech", "trading"],
+        "retail": ["retail", "store", "consumer", "shop", "brand", "e-commerce", "ecommerce",
+                  "merchandise", "product", "fashion", "food", "grocery", "chain"]
+    }
+
+    for category, keywords in categories.items():
+        for keyword in keywords:
+            if keyword in text:
+                return category
+    return "other"
+
+
+def legacy_categorize_articles(articles):
+    results = []
+    for article in articles:
+        title = article.get("title", "")
+        description = article.get("description", "")
+        ma_terms = r"merger|acquisition|acquire[sd]?|takeover|buy[s]? out|deal|combines with"
+        if re.search(ma_terms, f"{title} {description}".lower()):
+            results.append(legacy_categorize_article(title, description))
+        else:
+            results.append(None)
+    return results
+
+
+def make_articles(n, seed=0):
+    rng = random.Random(seed)
+    articles = []
+    for _ in range(n):
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12))).title()
+        description = None if rng.random() < 0.1 else " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 40)))
+        articles.append({"title": title, "description": description})
+    return articles
+
+
+def bench(fn, articles, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(articles)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--articles", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    articles = make_articles(args.articles)
+    if legacy_categorize_articles(articles) != categorize_articles(articles):
+        raise SystemExit("compiled categorizer disagrees with the legacy implementation")
+
+    legacy = bench(legacy_categorize_articles, articles, args.repeat)
+    compiled = bench(categorize_articles, articles, args.repeat)
+    print(f"articles: {args.articles}")
+    print(f"legacy:   {args.articles / legacy:>12,.0f} articles/s")
+    print(f"compiled: {args.articles / compiled:>12,.0f} articles/s  ({legacy / compiled:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
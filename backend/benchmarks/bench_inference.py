@@ -0,0 +1,79 @@
+"""
+Throughput of services.sentiment_analysis.analyze_batch across batch sizes
+and text lengths. The per-text cache is cleared before every timed pass so
+each text goes through the model.
+
+    python -m benchmarks.bench_inference --batch-sizes 1,8,32,64 --repeat 3
+"""
+import argparse
+import json
+import time
+
+from benchmarks import offline
+
+offline.configure()
+
+# Words per text; long texts are cut to SENTIMENT_MAX_LENGTH tokens by the tokenizer
+TEXT_LENGTHS = {"short": 12, "medium": 40, "long": 160}
+
+
+def fixture_texts(length, count):
+    """`count` texts of about `length` words built from the recorded headlines."""
+    import feedparser
+    from services.scraper import _parse_google_news, _parse_reddit
+
+    reddit, rss = offline._load_fixtures()
+    headlines = [text.split(" - ", 1)[0] for text in _parse_reddit(reddit) + _parse_google_news(feedparser.parse(rss))]
+    words = " ".join(headlines).split()
+
+    texts = []
+    for i in range(count):
+        start = (i * 7) % len(words)
+        chunk = (words[start:] + words)[:length]
+        # Number each text so duplicates never collapse into one model input
+        texts.append(f"{i} " + " ".join(chunk))
+    return texts
+
+
+def run(batch_sizes=(1, 8, 32, 64), lengths=tuple(TEXT_LENGTHS), texts_per_run=128, repeat=3):
+    from services import sentiment_analysis
+
+    sentiment_analysis.load_model()
+    sentiment_analysis.warmup_model()
+
+    results = {}
+    for length in lengths:
+        texts = fixture_texts(TEXT_LENGTHS[length], texts_per_run)
+        for batch_size in batch_sizes:
+            best = float("inf")
+            for _ in range(repeat):
+                sentiment_analysis.result_cache.clear()
+                started = time.perf_counter()
+                for offset in range(0, len(texts), batch_size):
+                    chunk = texts[offset:offset + batch_size]
+                    sentiment_analysis.analyze_batch(chunk, batch_size=batch_size)
+                best = min(best, time.perf_counter() - started)
+            results[f"analyze_batch.{length}.bs{batch_size}.texts_per_s"] = round(len(texts) / best, 2)
+            print(f"{length:>6}  batch {batch_size:>3}: {len(texts) / best:>9.1f} texts/s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", default="1,8,32,64")
+    parser.add_argument("--lengths", default=",".join(TEXT_LENGTHS))
+    parser.add_argument("--texts", type=int, default=128, help="texts per timed pass")
+    parser.add_argument("--repeat", type=int, default=3, help="passes per setting; the fastest is kept")
+    args = parser.parse_args()
+
+    results = run(
+        batch_sizes=[int(b) for b in args.batch_sizes.split(",")],
+        lengths=args.lengths.split(","),
+        texts_per_run=args.texts,
+        repeat=args.repeat,
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
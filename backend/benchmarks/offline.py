@@ -0,0 +1,133 @@
+"""
+Offline environment for the benchmarks: no network, no Supabase, no HF Hub.
+
+`configure()` must run before any app module is imported, since settings
+are read at import time. Reddit and Google News requests are answered from
+the recorded fixtures in benchmarks/fixtures, and Supabase calls go to an
+in-memory stub with a fixed artificial latency.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+# Syntactically valid anon key; the stubbed client never sends it anywhere
+DUMMY_SUPABASE_KEY = (
+    "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJyb2xlIjoiYW5vbiJ9."
+    "MLy4OEqLi-Ium1uLT7hrWCBysJW70V5aC5j_HwYsnuQ"
+)
+
+
+def configure():
+    """Offline defaults; anything already set in the environment wins."""
+    defaults = {
+        "SUPABASE_URL": "http://127.0.0.1:9",
+        "SUPABASE_KEY": DUMMY_SUPABASE_KEY,
+        "JWT_SECRET": "benchmark",
+        "JWT_ALGORITHM": "HS256",
+        "HF_HUB_OFFLINE": "1",
+        "TRANSFORMERS_OFFLINE": "1",
+        # Warm up explicitly instead of racing a background warm start
+        "SENTIMENT_EAGER_LOAD": "0",
+        # Every request should exercise the full pipeline
+        "QUERY_CACHE_TTL": "0",
+        "WRITE_BEHIND_ENABLED": "0",
+        # At most one NewsAPI fetch per run
+        "NEWS_REFRESH_INTERVAL": "86400",
+        # No tracked queries to refresh, and no snapshots short-circuiting /api/analyze
+        "TRACKING_ENABLED": "0",
+        "TRACKING_STORE_PATH": ":memory:",
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+
+
+def _load_fixtures():
+    reddit = json.loads((FIXTURES / "reddit_search.json").read_text())
+    rss = (FIXTURES / "google_news.rss").read_text()
+    return reddit, rss
+
+
+def fixture_transport(latency_ms=0.0, unique_texts=True):
+    """
+    httpx transport serving the fixtures for the scraper's Reddit and Google
+    News URLs, and failing everything else. With `unique_texts`, titles are
+    prefixed with the query so each query misses the per-text cache, as new
+    queries do in production.
+    """
+    import httpx
+
+    reddit, rss = _load_fixtures()
+
+    async def handler(request):
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        params = parse_qs(urlparse(str(request.url)).query)
+        query = params.get("q", [""])[0]
+        host = request.url.host
+
+        if host == "www.reddit.com":
+            payload = reddit
+            if unique_texts:
+                payload = json.loads(json.dumps(reddit))
+                for child in payload["data"]["children"]:
+                    child["data"]["title"] = f"{query}: {child['data']['title']}"
+            return httpx.Response(200, json=payload)
+
+        if host == "news.google.com":
+            body = rss
+            if unique_texts:
+                body = rss.replace("<item><title>", f"<item><title>{escape(query)}: ")
+            return httpx.Response(200, content=body.encode(), headers={"content-type": "application/rss+xml"})
+
+        return httpx.Response(503, text="offline benchmark")
+
+    return httpx.MockTransport(handler)
+
+
+def install_fixtures(latency_ms=0.0, unique_texts=True):
+    """Point the shared pooled HTTP client at the fixture transport."""
+    import httpx
+    from services import http_client
+
+    http_client._client = httpx.AsyncClient(transport=fixture_transport(latency_ms, unique_texts))
+
+
+class SupabaseStub:
+    """Stands in for services.db.execute; counts calls and answers with empty data."""
+
+    def __init__(self, latency_ms=0.0):
+        self.latency_ms = latency_ms
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    async def execute(self, query, name="query", timeout=None):
+        from services.db import db_stats
+
+        started = time.perf_counter()
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        db_stats.record(name, time.perf_counter() - started)
+        return SimpleNamespace(data=[], count=None)
+
+
+def install_supabase_stub(latency_ms=0.0):
+    """Swap `execute` in every loaded app module that imported it from services.db."""
+    import sys
+    from services import db
+
+    stub = SupabaseStub(latency_ms)
+    original = db.execute
+    for name, module in list(sys.modules.items()):
+        if name.startswith(("services.", "controllers.")) and getattr(module, "execute", None) is original:
+            module.execute = stub.execute
+    return stub
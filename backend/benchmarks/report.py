@@ -0,0 +1,126 @@
+"""
+Benchmark result files and run-to-run comparison.
+
+A result file is JSON with an `environment` block and a flat `metrics`
+map. Metric names say which direction is better: `*_per_s` is higher is
+better, `*_ms` and `*failures` are lower is better.
+
+    python -m benchmarks.report baseline.json current.json --threshold 0.10
+
+Exits with status 1 if any metric regressed by more than the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+# Settings that change performance and so belong next to the numbers
+RECORDED_SETTINGS = (
+    "SENTIMENT_BACKEND",
+    "SENTIMENT_MAX_LENGTH",
+    "INFERENCE_WORKERS",
+    "INFERENCE_THREADS_PER_WORKER",
+    "INFERENCE_MAX_BATCH_SIZE",
+    "INFERENCE_MAX_WAIT_MS",
+)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    info = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {name: os.getenv(name) for name in RECORDED_SETTINGS if os.getenv(name) is not None},
+    }
+    try:
+        import torch
+
+        info["torch"] = torch.__version__
+        info["torch_threads"] = torch.get_num_threads()
+    except ImportError:
+        pass
+    return info
+
+
+def save(metrics, path):
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "metrics": metrics}, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def higher_is_better(name):
+    return name.endswith("_per_s")
+
+
+def compare(baseline, current, threshold=0.10):
+    """Return (rows, regressions); each row is (metric, base, new, relative change, status)."""
+    base_metrics, new_metrics = baseline["metrics"], current["metrics"]
+    rows, regressions = [], []
+    for name in sorted(set(base_metrics) | set(new_metrics)):
+        base, new = base_metrics.get(name), new_metrics.get(name)
+        if base is None or new is None:
+            rows.append((name, base, new, None, "added" if base is None else "removed"))
+            continue
+        if base == 0:
+            change = 0.0 if new == 0 else float("inf")
+        else:
+            change = (new - base) / abs(base)
+        worse = -change if higher_is_better(name) else change
+        status = "ok"
+        if worse > threshold:
+            status = "REGRESSED"
+            regressions.append(name)
+        elif worse < -threshold:
+            status = "improved"
+        rows.append((name, base, new, change, status))
+    return rows, regressions
+
+
+def print_comparison(rows, baseline, current):
+    base_env, new_env = baseline.get("environment", {}), current.get("environment", {})
+    print(f"baseline: {base_env.get('commit')} {base_env.get('timestamp')}")
+    print(f"current:  {new_env.get('commit')} {new_env.get('timestamp')}")
+    if base_env.get("cpu_count") != new_env.get("cpu_count") or base_env.get("settings") != new_env.get("settings"):
+        print("warning: runs used different hardware or settings")
+    width = max((len(row[0]) for row in rows), default=10)
+    for name, base, new, change, status in rows:
+        delta = "" if change is None else f"{change * 100:+.1f}%"
+        print(f"{name:<{width}}  {base!s:>12}  {new!s:>12}  {delta:>8}  {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    baseline, current = load(args.baseline), load(args.current)
+    rows, regressions = compare(baseline, current, args.threshold)
+    print_comparison(rows, baseline, current)
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Run the offline benchmark suite and write one result file, optionally
+comparing it with an earlier run.
+
+    python -m benchmarks.run --out results.json
+    python -m benchmarks.run --out current.json --compare baseline.json
+
+Needs the sentiment model available locally (SENTIMENT_MODEL_PATH or the
+HF cache); nothing else touches the network.
+"""
+import argparse
+import sys
+
+from benchmarks import offline
+
+offline.configure()
+
+from benchmarks import bench_api, bench_categorizer, bench_inference, report  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="benchmark-results.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown (0.10 = 10%%)")
+    parser.add_argument("--quick", action="store_true", help="smaller runs for a fast sanity check")
+    parser.add_argument("--skip-api", action="store_true")
+    parser.add_argument("--skip-inference", action="store_true")
+    args = parser.parse_args()
+
+    metrics = {}
+    if not args.skip_inference:
+        print("== analyze_batch throughput")
+        metrics.update(bench_inference.run(repeat=1 if args.quick else 3, texts_per_run=64 if args.quick else 128))
+    if not args.skip_api:
+        print("== /api/analyze latency")
+        metrics.update(bench_api.run(requests=40 if args.quick else 200, warmup=8 if args.quick else 20))
+    print("== news categorizer")
+    articles = bench_categorizer.make_articles(2000 if args.quick else 20000)
+    best = bench_categorizer.bench(bench_categorizer.categorize_articles, articles, repeat=5)
+    metrics["categorizer.articles_per_s"] = round(len(articles) / best, 1)
+    print(f"categorizer: {len(articles) / best:,.0f} articles/s")
+
+    report.save(metrics, args.out)
+    print(f"Wrote {args.out}")
+
+    if args.compare:
+        baseline, current = report.load(args.compare), report.load(args.out)
+        rows, regressions = report.compare(baseline, current, args.threshold)
+        report.print_comparison(rows, baseline, current)
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
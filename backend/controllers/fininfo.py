@@ -1,21 +1,62 @@
+import asyncio
 import os
-import httpx
 from fastapi import HTTPException
 from datetime import datetime
 from dotenv import load_dotenv
 
+from services.http_client import get_client
+from services.metrics import upstream
+from services.query_cache import MemoryBackend, QueryCache
+
 load_dotenv()
 
 RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY")
 RAPIDAPI_HOST = os.getenv("RAPIDAPI_HOST")
+CALENDAR_CACHE_TTL = float(os.getenv("CALENDAR_CACHE_TTL", "900"))
+CALENDAR_CACHE_SIZE = int(os.getenv("CALENDAR_CACHE_SIZE", "2000"))
+# Upper bound on concurrent RapidAPI calls across all requests
+CALENDAR_MAX_CONCURRENCY = int(os.getenv("CALENDAR_MAX_CONCURRENCY", "8"))
+CALENDAR_MAX_TICKERS = int(os.getenv("CALENDAR_MAX_TICKERS", "50"))
 
-async def fetch_ma_events(ticker: str, region: str = "US", lang: str = "en-US"):
-    """
-    Fetch M&A-related calendar events for a given ticker.
+# Stale entries are served for one more TTL while a single refresh runs
+calendar_cache = QueryCache(
+    MemoryBackend(maxsize=CALENDAR_CACHE_SIZE), ttl=CALENDAR_CACHE_TTL, stale_ttl=CALENDAR_CACHE_TTL
+)
+_upstream_slots = asyncio.Semaphore(CALENDAR_MAX_CONCURRENCY)
 
-    Returns:
-        dict: {"eventsData": [ {id, title, date, time, type}, ... ]}
-    """
+
+def parse_events(data):
+    events = []
+    eid = 1
+    for day in data:
+        # Fallback timestamp for the day
+        day_ts = day.get("timestamp")  # in milliseconds
+
+        for rec in day.get("records", []):
+            # Prefer per-record filingDate, else fallback
+            ts = rec.get("filingDate") if rec.get("filingDate") is not None else day_ts
+            if ts is None:
+                continue  # skip records w/o any timestamp
+
+            # Convert ms timestamp to datetime
+            dt = datetime.fromtimestamp(ts / 1000)
+            date_str = dt.strftime("%b %-d, %Y")   # e.g. "Mar 11, 2025"
+            time_str = dt.strftime("%-I:%M %p")    # e.g. "12:00 AM"
+
+            title = f"{rec.get('companyName', '').strip()} {rec.get('type', '').strip()}"
+
+            events.append({
+                "id": eid,
+                "title": title,
+                "date": date_str,
+                "time": time_str,
+                "type": rec.get("type", "Other")
+            })
+            eid += 1
+    return events
+
+
+async def _request_events(ticker, region, lang):
     url = f"https://{RAPIDAPI_HOST}/stock/get-events-calendar"
     params = {
         "tickersFilter": ticker,
@@ -28,41 +69,63 @@ async def fetch_ma_events(ticker: str, region: str = "US", lang: str = "en-US"):
         "x-rapidapi-host": RAPIDAPI_HOST
     }
 
-    async with httpx.AsyncClient() as client:
-        try:
-            resp = await client.get(url, headers=headers, params=params)
+    async with _upstream_slots:
+        with upstream("rapidapi"):
+            resp = await get_client().get(url, headers=headers, params=params)
             resp.raise_for_status()
-            data = resp.json().get("finance", {}).get("result", {}).get("mixedEvents", [])
-
-            events = []
-            eid = 1
-            for day in data:
-                # Fallback timestamp for the day
-                day_ts = day.get("timestamp")  # in milliseconds
-
-                for rec in day.get("records", []):
-                    # Prefer per-record filingDate, else fallback
-                    ts = rec.get("filingDate") if rec.get("filingDate") is not None else day_ts
-                    if ts is None:
-                        continue  # skip records w/o any timestamp
-
-                    # Convert ms timestamp to datetime
-                    dt = datetime.fromtimestamp(ts / 1000)
-                    date_str = dt.strftime("%b %-d, %Y")   # e.g. "Mar 11, 2025"
-                    time_str = dt.strftime("%-I:%M %p")    # e.g. "12:00 AM"
-
-                    title = f"{rec.get('companyName', '').strip()} {rec.get('type', '').strip()}"
-
-                    events.append({
-                        "id": eid,
-                        "title": title,
-                        "date": date_str,
-                        "time": time_str,
-                        "type": rec.get("type", "Other")
-                    })
-                    eid += 1
-
-            return {"eventsData": events}
-
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to fetch calendar events: {e}")
+    data = resp.json().get("finance", {}).get("result", {}).get("mixedEvents", [])
+    return {"eventsData": parse_events(data)}
+
+
+async def _cached_events(ticker, region, lang):
+    return await calendar_cache.get_or_compute(
+        (ticker, region, lang), lambda: _request_events(ticker, region, lang)
+    )
+
+
+async def fetch_ma_events(ticker: str, region: str = "US", lang: str = "en-US"):
+    """
+    Fetch M&A-related calendar events for a given ticker.
+
+    Returns:
+        dict: {"eventsData": [ {id, title, date, time, type}, ... ]}
+    """
+    try:
+        return await _cached_events(ticker.strip().upper(), region, lang)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch calendar events: {e}")
+
+
+def parse_tickers(tickers: str):
+    """Split a comma-separated ticker list, normalizing case and dropping duplicates."""
+    parsed = list(dict.fromkeys(t.strip().upper() for t in tickers.split(",") if t.strip()))
+    if not parsed:
+        raise HTTPException(status_code=400, detail="No tickers given")
+    if len(parsed) > CALENDAR_MAX_TICKERS:
+        raise HTTPException(status_code=400, detail=f"At most {CALENDAR_MAX_TICKERS} tickers per request")
+    return parsed
+
+
+async def fetch_ma_events_many(tickers: list, region: str = "US", lang: str = "en-US"):
+    """
+    Fetch calendar events for several tickers concurrently.
+
+    Tickers are fetched in parallel (bounded by CALENDAR_MAX_CONCURRENCY) and
+    served from the per-(ticker, region, lang) cache when possible, so the
+    response time tracks the slowest ticker. A failing ticker does not fail
+    the request.
+
+    Returns:
+        dict: {"results": {ticker: {"eventsData": [...]}}, "errors": {ticker: message}}
+    """
+    outcomes = await asyncio.gather(
+        *(_cached_events(ticker, region, lang) for ticker in tickers), return_exceptions=True
+    )
+
+    results, errors = {}, {}
+    for ticker, outcome in zip(tickers, outcomes):
+        if isinstance(outcome, Exception):
+            errors[ticker] = f"Failed to fetch calendar events: {outcome}"
+        else:
+            results[ticker] = outcome
+    return {"results": results, "errors": errors}
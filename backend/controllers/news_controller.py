@@ -1,13 +1,24 @@
-from fastapi import HTTPException
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
 from pydantic import BaseModel
+from services.categorizer import categorize_articles
+from services.http_client import get_client
+from services.metrics import upstream
+import asyncio
+import gzip
+import hashlib
 import httpx
+import json
+import logging
 import os
+import time
 from typing import Optional, List
 from dotenv import load_dotenv
-import re
 
 load_dotenv()
 
+logger = logging.getLogger("sentilyst")
+
 class NewsArticle(BaseModel):
     title: str
     description: Optional[str] = None
@@ -24,32 +35,19 @@ class CategoryNews(BaseModel):
     retail: List[NewsArticle]
     other: List[NewsArticle]
 
-# Function to categorize news articles based on content
-def categorize_article(title, description):
-    title_lower = title.lower() if title else ""
-    desc_lower = description.lower() if description else ""
-    text = f"{title_lower} {desc_lower}"
-    
-    categories = {
-        "technology": ["tech", "software", "digital", "cloud", "online", "internet", "ai", 
-                      "artificial intelligence", "saas", "platform", "app", "semiconductor", 
-                      "computing", "cybersecurity", "data", "it ", "telecom"],
-        
-        "finance": ["bank", "financ", "invest", "capital", "fund", "asset", "wealth", 
-                   "insurance", "loan", "credit", "payment", "fintech", "trading"],
-        
-        "retail": ["retail", "store", "consumer", "shop", "brand", "e-commerce", "ecommerce", 
-                  "merchandise", "product", "fashion", "food", "grocery", "chain"]
-    }
-    
-    for category, keywords in categories.items():
-        for keyword in keywords:
-            if keyword in text:
-                return category
-    
-    return "other"
-
-async def fetch_ma_news():
+# The feed is re-fetched at most this often per process, and only while it is requested.
+# NewsAPI's free plan allows 100 requests a day: 1800 s stays under it with two processes.
+NEWS_REFRESH_INTERVAL = float(os.getenv("NEWS_REFRESH_INTERVAL", "1800"))
+
+# Last good categorized feed, pre-serialized for cheap responses
+_snapshot = None
+# The refresh in progress, awaited by every concurrent caller
+_inflight = None
+# time.monotonic() of the last refresh attempt, successful or not
+_last_attempt = None
+
+
+async def _fetch_categorized_news():
     api_key = os.getenv("NEWSAPI_KEY")
     if not api_key:
         raise HTTPException(status_code=500, detail="API key not found in environment variables.")
@@ -58,55 +56,139 @@ async def fetch_ma_news():
         "q": '(merger OR acquisition OR "M&A" OR takeover OR "buys out" OR "acquires")',
         "language": "en",
         "pageSize": 100,
-        "apiKey": api_key
     }
+    # Header rather than query param so the key never shows up in URLs, logs or error details
+    headers = {"X-Api-Key": api_key}
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get("https://newsapi.org/v2/everything", params=params)
+    client = get_client()
+    try:
+        with upstream("newsapi"):
+            response = await client.get("https://newsapi.org/v2/everything", params=params, headers=headers)
             response.raise_for_status()
-            data = response.json()
-            
-            if data.get('status') == 'ok':
-                articles = data.get('articles', [])
-                
-                categorized_news = {
-                    "all": [],
-                    "technology": [],
-                    
-                    "finance": [],
-              
-                    "retail": [],
-                    "other": []
-                }
-                
-                for article in articles:
+        data = response.json()
+
+        if data.get('status') == 'ok':
+            articles = data.get('articles', [])
+
+            categorized_news = {
+                "all": [],
+                "technology": [],
+
+                "finance": [],
+
+                "retail": [],
+                "other": []
+            }
+
+            for article, article_category in zip(articles, categorize_articles(articles)):
+                if article_category is not None:
                     title = article.get('title', '')
                     description = article.get('description', '')
-                    
-                    ma_terms = r"merger|acquisition|acquire[sd]?|takeover|buy[s]? out|deal|combines with"
-                    if re.search(ma_terms, f"{title} {description}".lower()):
-                        article_category = categorize_article(title, description)
-                        
-                        news_article = {
-                            "title": title,
-                            "description": description,
-                            "url": article['url'],
-                            "publishedAt": article['publishedAt'],
-                            "source": article['source']['name'] if article['source'] and 'name' in article['source'] else '',
-                            "urlToImage": article.get('urlToImage'),
-                            "category": article_category
-                        }
-                        
-                        categorized_news["all"].append(news_article)
-                        categorized_news[article_category].append(news_article)
-                
-                return categorized_news
-            else:
-                raise HTTPException(status_code=500, detail="Failed to fetch news from NewsAPI.")
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=500, detail=f"Request error: {e}")
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=f"HTTP error: {e}")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
+
+                    news_article = {
+                        "title": title,
+                        "description": description,
+                        "url": article['url'],
+                        "publishedAt": article['publishedAt'],
+                        "source": article['source']['name'] if article['source'] and 'name' in article['source'] else '',
+                        "urlToImage": article.get('urlToImage'),
+                        "category": article_category
+                    }
+
+                    categorized_news["all"].append(news_article)
+                    categorized_news[article_category].append(news_article)
+
+            return categorized_news
+        else:
+            raise HTTPException(status_code=500, detail="Failed to fetch news from NewsAPI.")
+    except HTTPException:
+        raise
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=500, detail=f"Request error: {e}")
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=f"HTTP error: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
+
+
+async def refresh_news():
+    """
+    Re-fetch the feed and swap in a new snapshot. Concurrent callers share
+    one upstream request, whether it succeeds or fails; on failure the last
+    good snapshot is kept and the error is raised only if there is nothing
+    to serve.
+    """
+    # A cancelled caller must not cancel the request the others are waiting on
+    return await asyncio.shield(_start_refresh())
+
+
+def _start_refresh():
+    global _inflight, _last_attempt
+    if _inflight is None:
+        _last_attempt = time.monotonic()
+        _inflight = asyncio.get_running_loop().create_task(_refresh_once())
+        _inflight.add_done_callback(_refresh_done)
+    return _inflight
+
+
+def _refresh_done(task):
+    global _inflight
+    if _inflight is task:
+        _inflight = None
+    if not task.cancelled():
+        # Marks a failure as seen even when every caller was cancelled
+        task.exception()
+
+
+async def _refresh_once():
+    global _snapshot
+    try:
+        data = await _fetch_categorized_news()
+    except HTTPException as e:
+        if _snapshot is None:
+            raise
+        logger.warning(f"NewsAPI refresh failed, serving snapshot from {time.monotonic() - _snapshot['fetched_at']:.0f}s ago: {e.detail}")
+        return _snapshot
+
+    body = json.dumps(data).encode()
+    _snapshot = {
+        "body": body,
+        "gzip": gzip.compress(body),
+        "etag": f'"{hashlib.sha1(body).hexdigest()}"',
+        "fetched_at": time.monotonic(),
+    }
+    return _snapshot
+
+
+async def stop_news_refresh():
+    """Cancel a background refresh still running at shutdown."""
+    if _inflight is not None:
+        _inflight.cancel()
+        try:
+            await _inflight
+        except (asyncio.CancelledError, HTTPException):
+            pass
+
+
+async def fetch_ma_news(request: Request):
+    snapshot = _snapshot
+    if snapshot is None:
+        # Nothing to serve yet; this request waits for the first fetch
+        snapshot = await refresh_news()
+    else:
+        # A failed attempt also waits out the interval before the next one
+        last_attempt = snapshot["fetched_at"] if _last_attempt is None else max(snapshot["fetched_at"], _last_attempt)
+        if time.monotonic() - last_attempt > NEWS_REFRESH_INTERVAL:
+            # Serve the stale copy and refresh behind it
+            _start_refresh()
+
+    headers = {
+        "ETag": snapshot["etag"],
+        "Cache-Control": f"public, max-age={int(NEWS_REFRESH_INTERVAL // 2)}",
+        "Vary": "Accept-Encoding",
+    }
+    if snapshot["etag"] in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return Response(content=snapshot["gzip"], media_type="application/json", headers={**headers, "Content-Encoding": "gzip"})
+    return Response(content=snapshot["body"], media_type="application/json", headers=headers)
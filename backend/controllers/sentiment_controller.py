@@ -1,13 +1,27 @@
 # controllers/sentiment_controller.py
-from fastapi import Request, HTTPException, Depends
-from fastapi.responses import JSONResponse
-from services.scraper import scrape_reddit, scrape_google_news
-from services.sentiment_analysis import analyze_batch, calculate_risk
-from supabase import create_client, Client
+from fastapi import Request, HTTPException, Depends, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from services.scraper import SOURCES, scrape_all, scrape_source
+from services.sentiment_analysis import aggregate_sentiment, to_tuples
+from services.inference_batcher import batcher
+from services.query_cache import query_cache, query_cache_key
+from services.db import supabase, execute
+from services.write_behind import WRITE_BEHIND_ENABLED, analyzed_data_writer
+from services.metrics import stage, stage_seconds
+from services.dedup import collapse
+from services.tracking_store import tracking_store
+from services.rollups import ROLLUPS_ENABLED, ROLLUP_TABLE, SUM_FIELDS, GRANULARITIES, bucket_range, rollup_writer, trend_point
+import asyncio
+import base64
+import hashlib
+import json
 import os
 import time
+import uuid
 import logging
+import numpy as np
 from datetime import datetime, timedelta
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -15,15 +29,57 @@ load_dotenv()
 logger = logging.getLogger("sentilyst")
 logger.setLevel(logging.INFO)
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+MAX_ANALYZED_ITEMS = 30
+
+def preprocess(scraped_data):
+    """Cap the items sent to the model and strip the trailing ' - <link>' from each."""
+    scraped_data_capped = scraped_data[:MAX_ANALYZED_ITEMS]
+    return [(post.split(" - ", 1)[0] if " - " in post else post)[:500] for post in scraped_data_capped]
+
+
+async def run_analysis(query):
+    """Scrape, score and aggregate a query. The result is shared across users via the query cache."""
+    # 1) Scraping (all sources concurrently, each under its own deadline)
+    with stage("analyze", "scrape"):
+        reddit_data, google_data = await scrape_all(query)
+    scraped_data = reddit_data + google_data
+
+    # 2) Preprocess - cap at 30 items, truncate text and collapse near-duplicates
+    with stage("analyze", "preprocess"):
+        texts = preprocess(scraped_data)
+        unique_texts, index, counted = collapse(texts)
+
+    # 3) Model inference (batched with other in-flight requests, off the event loop)
+    with stage("analyze", "inference"):
+        label_ids, confidences = await batcher.submit(unique_texts)
+
+    # 4) Aggregation; duplicates take their representative's result
+    with stage("analyze", "aggregate"):
+        return build_analysis(reddit_data, google_data, label_ids[index], confidences[index], counted)
+
+
+def build_analysis(reddit_data, google_data, label_ids, confidences, counted=None):
+    """
+    The cached analysis fields for one query, given its scraped items and
+    per-text results. `counted` masks which texts enter the aggregates.
+    """
+    if counted is not None:
+        label_ids, confidences = label_ids[counted], confidences[counted]
+    sentiment_count, sentiment_percentages, risk_level = aggregate_sentiment(label_ids, confidences)
+    scraped_data = reddit_data + google_data
+    return {
+        "scraped_data": scraped_data,
+        "sentiment_count": sentiment_count,
+        "sentiment_percentages": sentiment_percentages,
+        "risk_level": risk_level,
+        "reddit_count": len(reddit_data),
+        "google_news_count": len(google_data),
+        "total_results": len(scraped_data),
+    }
 
 
 async def analyze_sentiment(request: Request):
-    t0 = time.time()
-    # logger.info("Request started")
-    
     data = await request.json()
     query = data.get("query")
     if not query:
@@ -31,133 +87,421 @@ async def analyze_sentiment(request: Request):
 
     user = getattr(request.state, "user", None)
 
-    # 1) Scraping
-    reddit_data = scrape_reddit(query)
-    google_data = scrape_google_news(query)
-    scraped_data = reddit_data + google_data
-    t1 = time.time()
-    # logger.info(f"SCRAPING TOOK: {t1 - t0:.2f}s | Reddit: {len(reddit_data)} | Google News: {len(google_data)} | Total: {len(scraped_data)}")
-
-    # 2) Preprocess - cap at 30 items and truncate text
-    scraped_data_capped = scraped_data[:30]
-    texts = [(post.split(" - ", 1)[0] if " - " in post else post)[:500] for post in scraped_data_capped]
-    t2 = time.time()
-    # logger.info(f"PREPROCESS TOOK: {t2 - t1:.2f}s | Processed {len(texts)} items")
-    
-    # 3) Model inference
-    results = analyze_batch(texts)
-    t3 = time.time()
-    # logger.info(f"MODEL INFERENCE TOOK: {t3 - t2:.2f}s")
-    
-    # 4) Aggregation
-    sentiment_count = {"positive": 0, "neutral": 0, "negative": 0}
-    sentiment_confidences = {"positive": [], "neutral": [], "negative": []}
-    for label, conf in results:
-        key = label.lower()
-        sentiment_count[key] += 1
-        sentiment_confidences[key].append(conf)
-    
-    total = sum(sentiment_count.values()) or 1
-    sentiment_percentages = {
-        k: round(v / total * 100, 2) for k, v in sentiment_count.items()
-    }
-    risk_level = calculate_risk(sentiment_percentages, sentiment_confidences)
-    t4 = time.time()
-    # logger.info(f"AGGREGATION TOOK: {t4 - t3:.2f}s")
+    # 1-4) Scraping, inference and aggregation, shared by identical queries.
+    # Tracked queries are answered from the scheduler's precomputed snapshot.
+    with stage("analyze", "analysis"):
+        key = query_cache_key(query)
+        analysis = await tracking_store.fresh_analysis(key)
+        if analysis is None:
+            analysis = await query_cache.get_or_compute(key, lambda: run_analysis(query))
 
     # 5) DB/Storage
-    if user:
-        ist_time = datetime.utcnow() + timedelta(hours=5, minutes=30)
-        insert_data = {
-            "user_id": user,
-            "query": query,
-            "positive": sentiment_percentages.get("positive", 0.0),
-            "negative": sentiment_percentages.get("negative", 0.0),
-            "reddit_count": len(reddit_data),
-            "google_news_count": len(google_data),
-            "total_results": len(scraped_data),
-            "risk_level": risk_level,
-            "created_at": ist_time.isoformat(),
-        }
-        res = supabase.table("analyzed_data").insert(insert_data).execute()
-        if res.data is None:
-            raise HTTPException(status_code=500, detail="Supabase insert failed")
-        saved_created_at = insert_data["created_at"]
-    else:
-        saved_created_at = datetime.now().date().isoformat()
-    t5 = time.time()
-    # logger.info(f"DB SAVE TOOK: {t5 - t4:.2f}s")
-    # logger.info(f"TOTAL REQUEST TIME: {t5 - t0:.2f}s")
-    
+    with stage("analyze", "db"):
+        saved_created_at = await save_analysis(user, query, analysis)
+
+    return JSONResponse(analysis_response(query, analysis, saved_created_at, user))
+
+
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "50"))
+# Queries scraped at once; each one also fans out to every source
+BATCH_SCRAPE_CONCURRENCY = int(os.getenv("BATCH_SCRAPE_CONCURRENCY", "10"))
+
+
+async def run_batch_analysis(queries):
+    """
+    Analyze several queries with a single model submission.
+
+    Queries with a fresh query-cache entry are reused as is. The rest are
+    scraped concurrently, their texts de-duplicated across queries and
+    scored together, then split back per query and cached like /api/analyze
+    results. Returns ({query: analysis}, number of texts sent to the model).
+    """
+    analyses = {}
+    pending = []
+    for query in queries:
+        key = query_cache_key(query)
+        cached = await tracking_store.fresh_analysis(key) or await query_cache.peek(key)
+        if cached is not None:
+            analyses[query] = cached
+        else:
+            pending.append(query)
+    if not pending:
+        return analyses, 0
+
+    slots = asyncio.Semaphore(BATCH_SCRAPE_CONCURRENCY)
+
+    async def scrape(query):
+        async with slots:
+            return await scrape_all(query)
+
+    with stage("analyze_batch", "scrape"):
+        scraped = await asyncio.gather(*(scrape(query) for query in pending))
+
+    # Each query keeps the positions of its texts in the shared, de-duplicated list
+    with stage("analyze_batch", "preprocess"):
+        unique = {}
+        positions = []
+        masks = []
+        for reddit_data, google_data in scraped:
+            query_texts, index, counted = collapse(preprocess(reddit_data + google_data))
+            shared = np.array([unique.setdefault(text, len(unique)) for text in query_texts], dtype=np.int64)
+            positions.append(shared[index])
+            masks.append(counted)
+
+    with stage("analyze_batch", "inference"):
+        label_ids, confidences = await batcher.submit(list(unique))
+
+    with stage("analyze_batch", "aggregate"):
+        for query, (reddit_data, google_data), rows, counted in zip(pending, scraped, positions, masks):
+            analysis = build_analysis(reddit_data, google_data, label_ids[rows], confidences[rows], counted)
+            await query_cache.put(query_cache_key(query), analysis)
+            analyses[query] = analysis
+
+    return analyses, len(unique)
+
+
+async def analyze_sentiment_batch(request: Request):
+    """Analyze a list of queries (e.g. a watchlist) in one request; results keep the request order."""
+    data = await request.json()
+    queries = data.get("queries")
+    if not isinstance(queries, list) or not queries:
+        raise HTTPException(status_code=422, detail="Field 'queries' must be a non-empty list")
+
+    # Drop blanks and repeats that would share a query-cache entry
+    unique_queries = {}
+    for query in queries:
+        if isinstance(query, str) and query.strip():
+            unique_queries.setdefault(query_cache_key(query), query.strip())
+    queries = list(unique_queries.values())
+    if not queries:
+        raise HTTPException(status_code=422, detail="Field 'queries' must contain at least one query")
+    if len(queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_QUERIES} queries per request")
+
+    user = getattr(request.state, "user", None)
+
+    with stage("analyze_batch", "analysis"):
+        analyses, model_texts = await run_batch_analysis(queries)
+
+    with stage("analyze_batch", "db"):
+        saved_created_at = await save_analyses(user, [(query, analyses[query]) for query in queries])
+
     return JSONResponse({
+        "results": [analysis_response(query, analyses[query], saved_created_at, user) for query in queries],
+        "model_texts": model_texts,
+    })
+
+
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "10"))
+
+
+def _format_event(event, sse):
+    payload = json.dumps(event)
+    if sse:
+        return f"event: {event['event']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+async def stream_analysis(query, user):
+    """
+    Yield progress events for a query: one `scraped` event per source as it
+    returns, `sentiment` events as each chunk of items is scored, then a
+    `result` event with the same fields /api/analyze returns.
+    """
+    tasks = {asyncio.ensure_future(scrape_source(name, query)): name for name in SOURCES}
+    scraped = {}
+    scrape_started = time.perf_counter()
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = tasks[task]
+                scraped[name] = task.result()
+                yield {"event": "scraped", "source": name, "count": len(scraped[name]), "items": scraped[name]}
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    stage_seconds.observe(time.perf_counter() - scrape_started, "analyze_stream", "scrape")
+
+    reddit_data, google_data = scraped["reddit"], scraped["google_news"]
+    scraped_data = reddit_data + google_data
+    texts = preprocess(scraped_data)
+    unique_texts, index, counted = collapse(texts)
+    # Original positions of each unique text, so duplicates are reported with their representative
+    members = [[] for _ in unique_texts]
+    for i, position in enumerate(index.tolist()):
+        members[position].append(i)
+
+    # Score in chunks so results stream out as each one completes
+    chunks = [
+        (start, unique_texts[start:start + STREAM_CHUNK_SIZE])
+        for start in range(0, len(unique_texts), STREAM_CHUNK_SIZE)
+    ]
+
+    async def score(start, chunk):
+        return start, await batcher.submit(chunk)
+
+    label_ids = np.zeros(len(unique_texts), dtype=np.int64)
+    confidences = np.zeros(len(unique_texts), dtype=np.float64)
+    inference_started = time.perf_counter()
+    for next_done in asyncio.as_completed([score(start, chunk) for start, chunk in chunks]):
+        start, (chunk_ids, chunk_conf) = await next_done
+        label_ids[start:start + len(chunk_ids)] = chunk_ids
+        confidences[start:start + len(chunk_conf)] = chunk_conf
+        yield {
+            "event": "sentiment",
+            "items": [
+                {"index": i, "text": texts[i], "label": label, "confidence": confidence}
+                for offset, (label, confidence) in enumerate(to_tuples(chunk_ids, chunk_conf))
+                for i in members[start + offset]
+            ],
+        }
+
+    stage_seconds.observe(time.perf_counter() - inference_started, "analyze_stream", "inference")
+
+    with stage("analyze_stream", "aggregate"):
+        analysis = build_analysis(reddit_data, google_data, label_ids[index], confidences[index], counted)
+    with stage("analyze_stream", "db"):
+        saved_created_at = await save_analysis(user, query, analysis)
+    yield {"event": "result", **analysis_response(query, analysis, saved_created_at, user)}
+
+
+async def analyze_sentiment_stream(request: Request):
+    """Streaming /api/analyze: NDJSON by default, Server-Sent Events when the client accepts text/event-stream."""
+    data = await request.json()
+    query = data.get("query")
+    if not query:
+        raise HTTPException(status_code=422, detail="Field 'query' is required")
+
+    user = getattr(request.state, "user", None)
+    sse = "text/event-stream" in request.headers.get("accept", "")
+
+    async def body():
+        try:
+            async for event in stream_analysis(query, user):
+                yield _format_event(event, sse)
+        except Exception as e:
+            logger.exception("Streaming analysis failed")
+            detail = e.detail if isinstance(e, HTTPException) else "Analysis failed"
+            yield _format_event({"event": "error", "detail": detail}, sse)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def analysis_row(user, query, analysis):
+    """The analyzed_data row stored for one query."""
+    sentiment_percentages = analysis["sentiment_percentages"]
+    ist_time = datetime.utcnow() + timedelta(hours=5, minutes=30)
+    return {
+        "user_id": user,
         "query": query,
-        "scraped_data": scraped_data,
-        "sentiment_count": sentiment_count,
-        "sentiment_percentages": sentiment_percentages,
-        "risk_level": risk_level,
+        "positive": sentiment_percentages.get("positive", 0.0),
+        "negative": sentiment_percentages.get("negative", 0.0),
+        "reddit_count": analysis["reddit_count"],
+        "google_news_count": analysis["google_news_count"],
+        "total_results": analysis["total_results"],
+        "risk_level": analysis["risk_level"],
+        "created_at": ist_time.isoformat(),
+    }
+
+
+async def save_analysis(user, query, analysis):
+    """Store the analysis for an authenticated user; returns the created_at to report."""
+    return await save_analyses(user, [(query, analysis)])
+
+
+async def save_analyses(user, analyses):
+    """Store (query, analysis) pairs for an authenticated user in one insert; returns the created_at to report."""
+    if not user:
+        return datetime.now().date().isoformat()
+
+    rows = [analysis_row(user, query, analysis) for query, analysis in analyses]
+    if WRITE_BEHIND_ENABLED:
+        # Acknowledge now; the rows are bulk-inserted in the background and
+        # reach the rollups once they are (see main.startup_event)
+        await analyzed_data_writer.enqueue_many(rows)
+        return rows[0]["created_at"]
+
+    insert_data = rows[0] if len(rows) == 1 else rows
+    res = await execute(supabase.table("analyzed_data").insert(insert_data), "analyzed_data.insert")
+    if res.data is None:
+        raise HTTPException(status_code=500, detail="Supabase insert failed")
+    if ROLLUPS_ENABLED:
+        rollup_writer.add(rows)
+    return rows[0]["created_at"]
+
+
+def analysis_response(query, analysis, saved_created_at, user):
+    return {
+        "query": query,
+        "scraped_data": analysis["scraped_data"],
+        "sentiment_count": analysis["sentiment_count"],
+        "sentiment_percentages": analysis["sentiment_percentages"],
+        "risk_level": analysis["risk_level"],
         "created_at": saved_created_at,
         "saved": bool(user)
-    })
+    }
+
 
 
+# Only the fields the history view needs, projected server-side
+HISTORY_COLUMNS = "id, query, google_news_count, reddit_count, total_results, positive, negative, risk_level, created_at"
+# Most buckets one trend request returns (about 3 months hourly)
+TREND_MAX_POINTS = int(os.getenv("TREND_MAX_POINTS", "2200"))
 
-async def get_user_analysis(request: Request):
+
+def encode_cursor(row):
+    raw = json.dumps([row["created_at"], row["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Return the (created_at, id) a cursor points after. Both go into a
+    PostgREST filter string, so only an ISO timestamp and an integer or
+    UUID id are accepted.
+    """
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        created_at = datetime.fromisoformat(str(created_at)).isoformat()
+        row_id = str(row_id)
+        row_id = str(int(row_id)) if row_id.lstrip("-").isdigit() else str(uuid.UUID(row_id))
+        return created_at, row_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def parse_timestamp(value, name):
+    """Normalize an ISO date or timestamp query parameter, or reject it with a 400."""
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: expected an ISO date or timestamp")
+
+
+def ilike_exact(value):
+    """
+    An ILIKE pattern matching `value` itself, case-insensitively: LIKE
+    wildcards are escaped. PostgREST also reads `*` as `%` and has no
+    escape for it, so a `*` matches any single character.
+    """
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped.replace("*", "_")
+
+
+async def get_user_analysis(
+    request: Request,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    start: Optional[str] = Query(None, description="Only rows created at or after this ISO timestamp"),
+    end: Optional[str] = Query(None, description="Only rows created at or before this ISO timestamp"),
+    query: Optional[str] = Query(None, description="Only rows for this query (case-insensitive)"),
+):
     user = request.state.user
 
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    try:
-        response = supabase.table("analyzed_data").select("*").eq("user_id", user).order("created_at", desc=True).execute()
-
-        if response.data is None or len(response.data) == 0:
-            raise HTTPException(status_code=404, detail="No data found for the user")
-       # Return only the sexy fields you need
-        filtered_data = [
-            {
-                "id": item.get("id"),
-                "query": item.get("query"),
-                "google_news_count": item.get("google_news_count"),
-                "reddit_count": item.get("reddit_count"),
-                "total_results": item.get("total_results"),
-                "positive": item.get("positive"),
-                "negative": item.get("negative"),
-                "risk_level": item.get("risk_level"),
-                "created_at": item.get("created_at"),
-            }
-            for item in response.data
-        ]
-
-        return JSONResponse(content={"data": filtered_data})
+    # Keyset pagination on (created_at, id), newest first
+    builder = supabase.table("analyzed_data").select(HISTORY_COLUMNS).eq("user_id", user)
+    if start:
+        builder = builder.gte("created_at", parse_timestamp(start, "start"))
+    if end:
+        builder = builder.lte("created_at", parse_timestamp(end, "end"))
+    if query:
+        builder = builder.ilike("query", ilike_exact(query))
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        builder = builder.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{row_id}")')
+    builder = builder.order("created_at", desc=True).order("id", desc=True).limit(limit + 1)
 
+    try:
+        response = await execute(builder, "analyzed_data.select_page")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
-    
+
+    rows = response.data or []
+    if not rows and not cursor:
+        raise HTTPException(status_code=404, detail="No data found for the user")
+
+    page = rows[:limit]
+    content = {"data": page, "next_cursor": encode_cursor(page[-1]) if len(rows) > limit else None}
+
+    body = json.dumps(content, separators=(",", ":")).encode()
+    etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+
+async def get_trend(
+    request: Request,
+    query: str = Query(..., description="Query to chart (case-insensitive)"),
+    granularity: str = Query("day", description="hour or day"),
+    start: Optional[str] = Query(None, description="First bucket, e.g. 2024-06-01 or 2024-06-01T09"),
+    end: Optional[str] = Query(None, description="Last bucket, inclusive"),
+):
+    """Per-bucket averages of positive, negative and risk_level plus total volume, read from the rollups."""
+    user = request.state.user
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=422, detail=f"granularity must be one of {', '.join(GRANULARITIES)}")
+
+    key = query_cache_key(query)
+    low, high = bucket_range(start, end, granularity)
+    builder = (
+        supabase.table(ROLLUP_TABLE)
+        .select("bucket, " + ", ".join(SUM_FIELDS))
+        .eq("user_id", user)
+        .eq("query_key", key)
+        .eq("granularity", granularity)
+    )
+    if low:
+        builder = builder.gte("bucket", low)
+    if high:
+        builder = builder.lte("bucket", high)
+    # Newest buckets first so a long range is cut at its oldest end
+    builder = builder.order("bucket", desc=True).limit(TREND_MAX_POINTS)
+    response = await execute(builder, f"{ROLLUP_TABLE}.select_trend")
+
+    buckets = {row["bucket"]: tuple(row[field] for field in SUM_FIELDS) for row in response.data or []}
+    # Saves not flushed yet, so a chart reflects the analysis just made
+    for bucket, values in rollup_writer.pending_for(user, key, granularity).items():
+        if (low and bucket < low) or (high and bucket > high):
+            continue
+        current = buckets.get(bucket)
+        buckets[bucket] = values if current is None else tuple(a + b for a, b in zip(current, values))
+
+    points = [trend_point(bucket, sums) for bucket, sums in sorted(buckets.items()) if sums[0] > 0]
+    return {"query": key, "granularity": granularity, "points": points[-TREND_MAX_POINTS:]}
+
 
 async def delete_analysis(request: Request, id: str):
     user_id = request.state.user
     if not user_id:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    # Fetch the record
-    response = supabase.from_("analyzed_data") \
-        .select("*") \
-        .eq("id", id) \
-        .eq("user_id", user_id) \
-        .execute()
+    # Single conditional delete; no returned rows means it doesn't exist or isn't theirs
+    delete_response = await execute(
+        supabase.from_("analyzed_data")
+        .delete()
+        .eq("id", id)
+        .eq("user_id", user_id),
+        "analyzed_data.delete",
+    )
 
-    if not response.data:  # no rows found
-        raise HTTPException(status_code=404, detail="Item not found")
-
-    # Perform deletion
-    delete_response = supabase.from_("analyzed_data") \
-        .delete() \
-        .eq("id", id) \
-        .eq("user_id", user_id) \
-        .execute()
-
-    # If deletion didn’t return deleted rows, something broke
     if not delete_response.data:
-        raise HTTPException(status_code=500, detail="Supabase delete failed")
+        raise HTTPException(status_code=404, detail="Item not found")
 
+    if ROLLUPS_ENABLED:
+        rollup_writer.add(delete_response.data, sign=-1)
     return {"message": "Deleted"}
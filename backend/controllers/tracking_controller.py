@@ -0,0 +1,227 @@
+# controllers/tracking_controller.py
+from fastapi import Request, HTTPException
+from services.scraper import scrape_all
+from services.inference_batcher import batcher
+from services.dedup import collapse, normalize
+from services.db import supabase, execute
+from services.metrics import stage
+from services.tracking_store import TRACKING_REFRESH_INTERVAL, tracking_store
+from services.query_cache import query_cache_key
+from controllers.sentiment_controller import build_analysis, preprocess
+import asyncio
+import logging
+import os
+import numpy as np
+from datetime import datetime, timedelta
+from pydantic import BaseModel
+
+logger = logging.getLogger("sentilyst")
+
+# Set to 0 to run the scheduler in only one process when several share the store
+TRACKING_ENABLED = os.getenv("TRACKING_ENABLED", "1") == "1"
+# Tracked queries refreshed at once
+TRACKING_CONCURRENCY = int(os.getenv("TRACKING_CONCURRENCY", "4"))
+TRACKING_MAX_PER_USER = int(os.getenv("TRACKING_MAX_PER_USER", "50"))
+
+_scheduler = None
+_refresh_locks = {}
+
+
+class TrackRequest(BaseModel):
+    query: str
+
+
+def item_key(scraped_item):
+    """Items are keyed by their trailing URL, or by their normalized text when there is none."""
+    head, _, tail = scraped_item.rpartition(" - ")
+    if head and tail.startswith("http"):
+        return tail
+    return normalize(scraped_item)
+
+
+async def refresh_tracked_query(query):
+    """
+    Re-scrape a tracked query and re-score only the items not seen before.
+
+    Items already in the store keep their stored result; new items go
+    through near-duplicate collapsing and the batcher. The aggregates are
+    rebuilt from the per-item results and saved as the query's snapshot.
+    """
+    key = query_cache_key(query)
+    lock = _refresh_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        with stage("tracking", "scrape"):
+            reddit_data, google_data = await scrape_all(query)
+        scraped_data = reddit_data + google_data
+        texts = preprocess(scraped_data)
+        keys = [item_key(item) for item in scraped_data[:len(texts)]]
+        known = await asyncio.to_thread(tracking_store.get_items, key, keys)
+
+        unique_texts, index, counted = collapse(texts)
+        label_ids = np.zeros(len(unique_texts), dtype=np.int64)
+        confidences = np.zeros(len(unique_texts), dtype=np.float64)
+        # A duplicate group needs the model only if none of its items was scored before
+        pending = set(range(len(unique_texts)))
+        for i, position in enumerate(index.tolist()):
+            if position in pending and keys[i] in known:
+                label_ids[position], confidences[position] = known[keys[i]]
+                pending.discard(position)
+
+        pending = sorted(pending)
+        if pending:
+            with stage("tracking", "inference"):
+                new_ids, new_conf = await batcher.submit([unique_texts[position] for position in pending])
+            label_ids[pending] = new_ids
+            confidences[pending] = new_conf
+
+        item_ids, item_conf = label_ids[index], confidences[index]
+        analysis = build_analysis(reddit_data, google_data, item_ids, item_conf, counted)
+        await asyncio.to_thread(save_refresh, key, list(zip(keys, item_ids.tolist(), item_conf.tolist())), analysis)
+        logger.info(f"Refreshed tracked query {query!r}: {len(texts)} items, {len(pending)} scored")
+        return analysis
+
+
+def save_refresh(key, items, analysis):
+    tracking_store.put_items(key, items)
+    tracking_store.set_snapshot(key, analysis)
+
+
+def ist_isoformat(timestamp):
+    """A Unix timestamp in the IST, offset-free ISO format the created_at columns use."""
+    return (datetime.utcfromtimestamp(timestamp) + timedelta(hours=5, minutes=30)).isoformat()
+
+
+async def tracked_queries():
+    """Distinct tracked queries across all users, one spelling per query key."""
+    response = await execute(supabase.table("tracked_queries").select("query"), "tracked_queries.select_all")
+    queries = {}
+    for row in response.data or []:
+        queries.setdefault(query_cache_key(row["query"]), row["query"])
+    return list(queries.values())
+
+
+async def refresh_all_tracked():
+    queries = await tracked_queries()
+
+    # Drop state for queries nobody tracks any more
+    tracked_keys = {query_cache_key(query) for query in queries}
+    for key in await asyncio.to_thread(tracking_store.query_keys):
+        if key not in tracked_keys:
+            await asyncio.to_thread(tracking_store.forget, key)
+            _refresh_locks.pop(key, None)
+
+    slots = asyncio.Semaphore(TRACKING_CONCURRENCY)
+
+    async def refresh(query):
+        async with slots:
+            try:
+                await refresh_tracked_query(query)
+            except Exception as e:
+                logger.warning(f"Refreshing tracked query {query!r} failed: {e!r}")
+
+    await asyncio.gather(*(refresh(query) for query in queries))
+
+
+async def _scheduler_loop():
+    while True:
+        try:
+            await refresh_all_tracked()
+        except Exception as e:
+            logger.warning(f"Tracked query refresh failed: {e!r}")
+        await asyncio.sleep(TRACKING_REFRESH_INTERVAL)
+
+
+def start_tracking_scheduler():
+    global _scheduler
+    if TRACKING_ENABLED and _scheduler is None:
+        _scheduler = asyncio.get_running_loop().create_task(_scheduler_loop())
+
+
+async def stop_tracking_scheduler():
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.cancel()
+        try:
+            await _scheduler
+        except asyncio.CancelledError:
+            pass
+        _scheduler = None
+
+
+def _refresh_in_background(query):
+    def done(task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Initial refresh of tracked query {query!r} failed: {task.exception()!r}")
+
+    asyncio.get_running_loop().create_task(refresh_tracked_query(query)).add_done_callback(done)
+
+
+async def get_tracked(request: Request):
+    user_id = request.state.user
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    response = await execute(
+        supabase.table("tracked_queries").select("id, query, created_at").eq("user_id", user_id).order("created_at"),
+        "tracked_queries.select",
+    )
+    rows = response.data or []
+    entries = await asyncio.to_thread(
+        lambda: [tracking_store.get_snapshot(query_cache_key(row["query"])) for row in rows]
+    )
+    tracked = []
+    for row, entry in zip(rows, entries):
+        snapshot = entry[0] if entry else None
+        tracked.append({
+            **row,
+            "risk_level": snapshot["risk_level"] if snapshot else None,
+            "sentiment_percentages": snapshot["sentiment_percentages"] if snapshot else None,
+            "refreshed_at": ist_isoformat(entry[1]) if entry else None,
+        })
+    return {"data": tracked}
+
+
+async def track_query(req: TrackRequest, request: Request):
+    user_id = request.state.user
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    query = req.query.strip()
+    if not query:
+        raise HTTPException(status_code=422, detail="Field 'query' is required")
+
+    existing = await execute(
+        supabase.table("tracked_queries").select("id, query").eq("user_id", user_id), "tracked_queries.select"
+    )
+    rows = existing.data or []
+    for row in rows:
+        if query_cache_key(row["query"]) == query_cache_key(query):
+            return {"id": row["id"], "query": row["query"], "tracking": True}
+    if len(rows) >= TRACKING_MAX_PER_USER:
+        raise HTTPException(status_code=400, detail=f"At most {TRACKING_MAX_PER_USER} tracked queries")
+
+    ist_time = datetime.utcnow() + timedelta(hours=5, minutes=30)
+    result = await execute(
+        supabase.table("tracked_queries").insert({"user_id": user_id, "query": query, "created_at": ist_time.isoformat()}),
+        "tracked_queries.insert",
+    )
+    if not result.data:
+        raise HTTPException(status_code=500, detail="Supabase insert failed")
+
+    if TRACKING_ENABLED and await tracking_store.fresh_analysis(query_cache_key(query)) is None:
+        _refresh_in_background(query)
+    return {"id": result.data[0]["id"], "query": query, "tracking": True}
+
+
+async def untrack_query(request: Request, id: str):
+    user_id = request.state.user
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    # Precomputed state is dropped on the next scheduler pass if no one else tracks the query
+    deleted = await execute(
+        supabase.table("tracked_queries").delete().eq("id", id).eq("user_id", user_id), "tracked_queries.delete"
+    )
+    if not deleted.data:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return {"message": "Deleted"}
@@ -3,28 +3,22 @@ import random
 import uuid
 from datetime import datetime, timedelta
 
-import requests
 from dotenv import load_dotenv
 from fastapi import HTTPException, Request
 from fastapi.responses import JSONResponse
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from pydantic import BaseModel, EmailStr
+from services.auth import InvalidGoogleToken, hash_password, verify_google_token, verify_password
 from services.email import send_email_otp
-from supabase import Client, create_client
+from services.db import execute, supabase
+from services.user_cache import email_filter, profile_cache
 
 load_dotenv()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 JWT_SECRET = os.getenv("JWT_SECRET")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
 class EmailRequest(BaseModel):
     email: EmailStr
 
@@ -61,17 +55,40 @@ class LoginRequest(BaseModel):
 class GoogleToken(BaseModel):
     token: str
 
+async def email_registered(email: str) -> bool:
+    # Only possible hits in the Bloom filter need the users table
+    if not email_filter.might_exist(email):
+        return False
+    result = await execute(supabase.table("users").select("email").eq("email", email), "users.select_email")
+    return bool(result.data)
+
+
+def profile_of(user: dict) -> dict:
+    return {"full_name": user["full_name"], "email": user["email"], "profile_url": user.get("profile_url")}
+
+
+async def load_profile(user_id: str):
+    result = await execute(
+        supabase
+        .table("users")
+        .select("full_name, email, profile_url")
+        .eq("id", user_id)
+        .single(),
+        "users.select_profile",
+    )
+    return result.data
+
+
 async def send_otp(req: EmailRequest):
     email = req.email
-    exists = supabase.table("users").select("email").eq("email", email).execute().data
-    if exists:
+    if await email_registered(email):
         raise HTTPException(status_code=400, detail="Email already registered")
 
     otp = generate_otp()
     token = create_otp_jwt(email, otp)
 
     try:
-        send_email_otp(email, otp)
+        await send_email_otp(email, otp)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Email send error: {e}")
 
@@ -92,17 +109,17 @@ async def register(req: RegisterRequest, request: Request):
     if not req.password:
         raise HTTPException(status_code=400, detail="Password is required")
     
-    hashed_pw = pwd_context.hash(req.password)
+    hashed_pw = await hash_password(req.password)
 
     ist_time = datetime.utcnow() + timedelta(hours=5, minutes=30)
 
-    result = supabase.table("users").insert({
+    result = await execute(supabase.table("users").insert({
         "email": req.email,
         "full_name": req.fullName,
         "password": hashed_pw,
         "created_at": ist_time.isoformat(),
         "updated_at": ist_time.isoformat(),
-    }).execute()
+    }), "users.insert")
 
     if not result.data:
         raise HTTPException(
@@ -111,6 +128,8 @@ async def register(req: RegisterRequest, request: Request):
         )
 
     user = result.data[0]
+    email_filter.add(req.email)
+    await profile_cache.put(str(user["id"]), profile_of(user))
 
     user_data = {
         "sub": str(user["id"]),
@@ -125,17 +144,15 @@ async def register(req: RegisterRequest, request: Request):
 
 
 async def check_email(req: CheckEmailRequest):
-    result = supabase.table("users").select("email").eq("email", req.email).execute()
-    if result.data:
-        return {"exists": True}
-    else:
-        return {"exists": False}
+    return {"exists": await email_registered(req.email)}
     
 
 
 
 async def login(req: LoginRequest, request: Request):
-    result = supabase.table("users").select("id, password, full_name").eq("email", req.email).single().execute()
+    result = await execute(
+        supabase.table("users").select("id, password, full_name").eq("email", req.email).single(), "users.select_login"
+    )
 
     if not result.data:
         raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -144,7 +161,7 @@ async def login(req: LoginRequest, request: Request):
     stored_password = user["password"]
     full_name = user["full_name"]
 
-    if not pwd_context.verify(req.password, stored_password):
+    if not await verify_password(req.password, stored_password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     # Create access token for login
@@ -165,11 +182,11 @@ async def google_login(data: GoogleToken, request: Request):
     try:
         # 1. Verify token with Google
         google_token = data.token
-        response = requests.get(f"https://oauth2.googleapis.com/tokeninfo?id_token={google_token}")
-        if response.status_code != 200:
+        try:
+            user_info = await verify_google_token(google_token)
+        except InvalidGoogleToken:
             raise HTTPException(status_code=401, detail="Invalid Google token")
-        
-        user_info = response.json()
+
         email = user_info.get("email")
         name = user_info.get("name")
         picture = user_info.get("picture")
@@ -178,7 +195,7 @@ async def google_login(data: GoogleToken, request: Request):
             raise HTTPException(status_code=400, detail="Missing email or name in token")
 
         # 2. Check if user exists in Supabase
-        existing_user = supabase.table("users").select("*").eq("email", email).execute()
+        existing_user = await execute(supabase.table("users").select("*").eq("email", email), "users.select")
 
         ist_time = datetime.utcnow() + timedelta(hours=5, minutes=30)
 
@@ -194,18 +211,27 @@ async def google_login(data: GoogleToken, request: Request):
                 "created_at": ist_time.isoformat(),
                 "updated_at": ist_time.isoformat(),
             }
-            insert_response = supabase.table("users").insert(new_user).execute()
+            insert_response = await execute(supabase.table("users").insert(new_user), "users.insert")
 
             if not insert_response.data:
                 raise HTTPException(status_code=500, detail="Google login user insert failed.")
 
             user_id = new_user["id"]
+            email_filter.add(email)
+            await profile_cache.put(user_id, profile_of(new_user))
         else:
-            user_id = existing_user.data[0]["id"]
+            user = existing_user.data[0]
+            user_id = user["id"]
             
             # Update the profile URL if it's a Google login for existing user
-            if picture and (not existing_user.data[0].get("profile_url") or existing_user.data[0].get("profile_url") != picture):
-                supabase.table("users").update({"profile_url": picture, "updated_at": ist_time.isoformat()}).eq("id", user_id).execute()
+            if picture and (not user.get("profile_url") or user.get("profile_url") != picture):
+                await execute(
+                    supabase.table("users").update({"profile_url": picture, "updated_at": ist_time.isoformat()}).eq("id", user_id),
+                    "users.update",
+                )
+                user = {**user, "profile_url": picture}
+            # Write through so /email/data shows the new picture right away
+            await profile_cache.put(str(user_id), profile_of(user))
 
         # 4. Create your app's JWT
         payload = {
@@ -241,15 +267,7 @@ async def get_user_data(request: Request):
         raise HTTPException(status_code=401, detail="Unauthorized")
 
     try:
-        result = (
-            supabase
-            .table("users")
-            .select("full_name, email, profile_url")
-            .eq("id", user_id)
-            .single()
-            .execute()
-        )
-        user = result.data
+        user = await profile_cache.get_or_compute(str(user_id), lambda: load_profile(user_id))
 
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
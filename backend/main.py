@@ -1,10 +1,14 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from routes import email_routes
 from routes import sentiment_routes
 from routes import news_routes
 from routes import company_routes
+from routes import tracking_routes
 from middleware.auth_middleware import AuthMiddleware
+from middleware.metrics_middleware import MetricsMiddleware
+import asyncio
 import os
 import logging
 from dotenv import load_dotenv
@@ -20,12 +24,64 @@ logger = logging.getLogger("sentilyst")
 
 app = FastAPI()
 
+SENTIMENT_EAGER_LOAD = os.getenv("SENTIMENT_EAGER_LOAD", "1") == "1"
+
+def warm_start():
+    """Load the model and warm up; runs off the event loop."""
+    from services.sentiment_analysis import load_model, warmup_model
+    try:
+        load_model()
+        warmup_model()
+    except Exception:
+        logger.exception("Sentiment model warm start failed")
+
 @app.on_event("startup")
 async def startup_event():
-    # logger.info("Warming up sentiment model...")
-    from services.sentiment_analysis import warmup_model
-    warmup_model()
-    # logger.info("Model warmed up and ready")
+    from services.inference_pool import pool
+    # Fork inference workers first, on the main thread and before any other
+    # thread exists: forking a multi-threaded process can deadlock the
+    # children on locks held by other threads. This loads the model, so with
+    # INFERENCE_WORKERS > 0 serving starts only once the weights are in memory.
+    if pool.enabled:
+        pool.start()
+
+    from services.inference_batcher import batcher
+    from services.write_behind import WRITE_BEHIND_ENABLED, analyzed_data_writer
+    from services.rollups import ROLLUPS_ENABLED, rollup_writer
+    from services.user_cache import EMAIL_FILTER_ENABLED, email_filter
+    from controllers.tracking_controller import start_tracking_scheduler
+    batcher.start()
+    start_tracking_scheduler()
+    if WRITE_BEHIND_ENABLED:
+        analyzed_data_writer.start()
+    if ROLLUPS_ENABLED:
+        rollup_writer.start()
+        # Queued saves are counted once they are in analyzed_data
+        analyzed_data_writer.on_flushed = rollup_writer.add
+    if EMAIL_FILTER_ENABLED:
+        email_filter.start()
+    # Serve /health and non-ML routes right away; /ready flips once the model is warm
+    if SENTIMENT_EAGER_LOAD:
+        asyncio.get_running_loop().run_in_executor(None, warm_start)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    from services.inference_batcher import batcher
+    from services.http_client import close_client
+    from services.inference_pool import pool
+    from services.write_behind import analyzed_data_writer
+    from services.rollups import rollup_writer
+    from services.user_cache import email_filter
+    from controllers.news_controller import stop_news_refresh
+    from controllers.tracking_controller import stop_tracking_scheduler
+    await stop_news_refresh()
+    await stop_tracking_scheduler()
+    await batcher.stop()
+    await analyzed_data_writer.stop()
+    await rollup_writer.stop()
+    await email_filter.stop()
+    pool.shutdown()
+    await close_client()
 
 CLIENT_URL = os.getenv("CLIENT_URL")
 PROD_CLIENT_URL = os.getenv("PROD_CLIENT_URL")
@@ -41,16 +97,38 @@ app.add_middleware(
 )
 
 app.add_middleware(AuthMiddleware)
+# Added last so it is outermost and its timings include the other middleware
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(email_routes.router, prefix="/api")
 app.include_router(sentiment_routes.router, prefix="/api")
 app.include_router(news_routes.router, prefix="/api")
 app.include_router(company_routes.router, prefix="/api")
+app.include_router(tracking_routes.router, prefix="/api")
 
 @app.get("/")
 def root():
     return {"message": "Backend up and ready"}
 
+@app.get("/health")
+def health():
+    """Liveness: the process is up and serving."""
+    return {"status": "ok"}
+
+@app.get("/ready")
+def ready():
+    """Readiness: the sentiment model is loaded and warmed up (always ready when loading lazily)."""
+    from services.sentiment_analysis import model_status
+    status = model_status()
+    is_ready = status == "ready" or not SENTIMENT_EAGER_LOAD
+    return JSONResponse({"ready": is_ready, "model": status}, status_code=200 if is_ready else 503)
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text exposition of request, stage, inference and upstream metrics."""
+    from services.metrics import render
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
 # if __name__ == "__main__":
 #     import uvicorn
 #     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,36 +1,110 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
-from fastapi import HTTPException
+from collections import OrderedDict
 from jose import jwt, JWTError
 import os
+import time
 
 JWT_SECRET = os.getenv("JWT_SECRET")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM")
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+# Tokens without an exp claim are re-verified after this many seconds
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "300"))
 
-class AuthMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        authorization: str = request.headers.get("Authorization")
-        if authorization:
-            try:
-                scheme, token = authorization.split()
-                if scheme.lower() != "bearer":
-                    raise HTTPException(status_code=401, detail="Invalid authentication scheme.")
-                payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-                # print("✅ Decoded Token Payload:", payload)
-                user_id = payload.get("sub")
-                # print("✅ User ID:", user_id)
-                if not user_id:
-                    # Instead of raising, set user to None and continue
-                    request.state.user = None
-                else:
-                    request.state.user = user_id
-            except (JWTError, ValueError):
-                # Instead of raising, set user to None and continue
-                request.state.user = None
-        else:
-            # No token provided, user_id will be None
-            request.state.user = None
-
-        response: Response = await call_next(request)
-        return response
+# Routes that never look at request.state.user; their tokens are not decoded
+PUBLIC_PATHS = frozenset({"/", "/health", "/ready", "/metrics", "/docs", "/redoc", "/openapi.json"})
+PUBLIC_PREFIXES = (
+    "/docs/",
+    "/api/news/",
+    "/api/calendar/",
+    "/api/register/",
+    "/api/email/send-otp",
+    "/api/email/verify-otp",
+    "/api/email/register",
+    "/api/email/check-email",
+    "/api/email/login",
+    "/api/email/google-login",
+)
+
+
+class TokenCache:
+    """Bounded LRU of verified token -> (user_id, expires_at)."""
+
+    def __init__(self, maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+
+    def get(self, token, now):
+        entry = self._data.get(token)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            del self._data[token]
+            return None
+        self._data.move_to_end(token)
+        return entry
+
+    def set(self, token, user_id, exp, now):
+        expires_at = now + self.ttl
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        if expires_at <= now or self.maxsize <= 0:
+            return
+        self._data[token] = (user_id, expires_at)
+        self._data.move_to_end(token)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+token_cache = TokenCache()
+
+
+def _bearer_token(headers):
+    for name, value in headers:
+        if name == b"authorization":
+            parts = value.decode("latin-1").split()
+            if len(parts) == 2 and parts[0].lower() == "bearer":
+                return parts[1]
+            return None
+    return None
+
+
+def authenticate(token):
+    """Return the user id for a bearer token, or None if it is invalid or expired."""
+    now = time.time()
+    entry = token_cache.get(token, now)
+    if entry is not None:
+        return entry[0]
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except JWTError:
+        return None
+    user_id = payload.get("sub")
+    if user_id:
+        token_cache.set(token, user_id, payload.get("exp"), now)
+    return user_id or None
+
+
+class AuthMiddleware:
+    """
+    Pure ASGI middleware that sets request.state.user to the bearer token's
+    subject, or None. Requests are never rejected here; handlers decide.
+
+    Verified tokens are cached until they expire, so repeat requests skip
+    signature verification. Public routes skip token handling altogether.
+    Unlike BaseHTTPMiddleware, the response is passed through untouched,
+    so streaming responses are not buffered.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            path = scope["path"]
+            user = None
+            if path not in PUBLIC_PATHS and not path.startswith(PUBLIC_PREFIXES):
+                token = _bearer_token(scope["headers"])
+                if token:
+                    user = authenticate(token)
+            scope.setdefault("state", {})["user"] = user
+        await self.app(scope, receive, send)
@@ -0,0 +1,47 @@
+import time
+
+from services.metrics import (
+    SERVER_TIMING,
+    end_request_timings,
+    request_seconds,
+    server_timing_header,
+    start_request_timings,
+)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware that records request latency per route template and,
+    with SERVER_TIMING=1, adds a Server-Timing header listing the stages the
+    handler timed before the response started.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings, token = start_request_timings()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING:
+                    header = server_timing_header(timings, time.perf_counter() - started)
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end_request_timings(token)
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            request_seconds.observe(time.perf_counter() - started, scope["method"], route_path, str(status))
@@ -0,0 +1,3 @@
+-- Keyset pagination for /api/getdata: rows for one user, newest first by (created_at, id)
+create index if not exists analyzed_data_user_created_id_idx
+    on analyzed_data (user_id, created_at desc, id desc);
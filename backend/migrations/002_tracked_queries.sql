@@ -0,0 +1,10 @@
+-- Queries users track (/api/tracked); created_at is IST without an offset, like analyzed_data.created_at.
+create table if not exists tracked_queries (
+    id bigint generated by default as identity primary key,
+    user_id uuid not null references users (id) on delete cascade,
+    query text not null,
+    created_at timestamp not null
+);
+
+create index if not exists tracked_queries_user_created_idx
+    on tracked_queries (user_id, created_at);
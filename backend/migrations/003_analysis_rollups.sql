@@ -0,0 +1,17 @@
+-- Hourly and daily per-(user, query) sums behind /api/trend, maintained by services/rollups.py.
+-- The primary key is the upsert conflict target (rollups.CONFLICT_COLUMNS). Buckets are IST,
+-- like analyzed_data.created_at: 'YYYY-MM-DDTHH:00:00' for hours, 'YYYY-MM-DD' for days.
+-- Backfill it from analyzed_data right after creating it: python -m services.rollups
+create table if not exists analysis_rollups (
+    user_id uuid not null references users (id) on delete cascade,
+    query_key text not null,
+    granularity text not null check (granularity in ('hour', 'day')),
+    bucket text not null,
+    analyses bigint not null default 0,
+    positive_sum double precision not null default 0,
+    negative_sum double precision not null default 0,
+    risk_sum double precision not null default 0,
+    volume bigint not null default 0,
+    updated_at timestamptz not null default now(),
+    primary key (user_id, query_key, granularity, bucket)
+);
@@ -1,10 +1,19 @@
-from fastapi import APIRouter, Query
-from controllers.fininfo import fetch_ma_events
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from controllers.fininfo import fetch_ma_events, fetch_ma_events_many, parse_tickers
 
 router = APIRouter(prefix="/calendar", tags=["Calendar"])
 
 @router.get("/events")
 async def get_calendar_events(
-    ticker: str = Query(..., description="Ticker symbol, e.g., AMRN")
+    ticker: Optional[str] = Query(None, description="Ticker symbol, e.g., AMRN"),
+    tickers: Optional[str] = Query(None, description="Comma-separated tickers, e.g., AMRN,MSFT"),
+    region: str = Query("US"),
+    lang: str = Query("en-US"),
 ):
-    return await fetch_ma_events(ticker)
+    if tickers:
+        return await fetch_ma_events_many(parse_tickers(tickers), region, lang)
+    if not ticker:
+        raise HTTPException(status_code=400, detail="Provide ticker or tickers")
+    return await fetch_ma_events(ticker, region, lang)
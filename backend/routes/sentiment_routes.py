@@ -5,8 +5,11 @@ from controllers import sentiment_controller
 router = APIRouter(tags=["Analyze"])
 
 router.post("/analyze")(sentiment_controller.analyze_sentiment)
+router.post("/analyze/batch")(sentiment_controller.analyze_sentiment_batch)
+router.post("/analyze/stream")(sentiment_controller.analyze_sentiment_stream)
 router.delete("/delete/{id}")(sentiment_controller.delete_analysis)
 
 
 router.get("/getdata")(sentiment_controller.get_user_analysis)
+router.get("/trend")(sentiment_controller.get_trend)
 
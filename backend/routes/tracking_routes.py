@@ -0,0 +1,8 @@
+from fastapi import APIRouter
+from controllers import tracking_controller
+
+router = APIRouter(prefix="/tracked", tags=["Tracking"])
+
+router.get("")(tracking_controller.get_tracked)
+router.post("")(tracking_controller.track_query)
+router.delete("/{id}")(tracking_controller.untrack_query)
@@ -0,0 +1,69 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+from services.http_client import get_client
+from services.metrics import upstream
+
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event
+# loop while capping how many cores a login burst can take from inference
+BCRYPT_MAX_WORKERS = int(os.getenv("BCRYPT_MAX_WORKERS") or max(1, (os.cpu_count() or 1) // 2))
+GOOGLE_TOKEN_CACHE_SIZE = int(os.getenv("GOOGLE_TOKEN_CACHE_SIZE", "1000"))
+GOOGLE_TOKENINFO_URL = "https://oauth2.googleapis.com/tokeninfo"
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+_bcrypt_executor = ThreadPoolExecutor(max_workers=BCRYPT_MAX_WORKERS, thread_name_prefix="bcrypt")
+
+
+async def hash_password(password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_bcrypt_executor, pwd_context.hash, password)
+
+
+async def verify_password(password, hashed):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_bcrypt_executor, pwd_context.verify, password, hashed)
+
+
+class InvalidGoogleToken(Exception):
+    pass
+
+
+# token -> (user_info, expires_at), evicted LRU
+_google_tokens = OrderedDict()
+
+
+async def verify_google_token(token):
+    """
+    Return Google's tokeninfo claims for an ID token, raising
+    InvalidGoogleToken if Google rejects it. Verified tokens are cached
+    until their exp claim, so retries skip the round trip.
+    """
+    now = time.time()
+    entry = _google_tokens.get(token)
+    if entry is not None:
+        if entry[1] > now:
+            _google_tokens.move_to_end(token)
+            return entry[0]
+        del _google_tokens[token]
+
+    with upstream("google_tokeninfo"):
+        response = await get_client().get(GOOGLE_TOKENINFO_URL, params={"id_token": token})
+    if response.status_code != 200:
+        raise InvalidGoogleToken(f"tokeninfo returned {response.status_code}")
+    user_info = response.json()
+
+    try:
+        expires_at = float(user_info.get("exp", 0))
+    except (TypeError, ValueError):
+        expires_at = 0
+    if expires_at > now:
+        _google_tokens[token] = (user_info, expires_at)
+        while len(_google_tokens) > GOOGLE_TOKEN_CACHE_SIZE:
+            _google_tokens.popitem(last=False)
+    return user_info
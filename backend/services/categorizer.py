@@ -0,0 +1,63 @@
+# Checked in this order; the first category with any matching keyword wins
+CATEGORY_KEYWORDS = {
+    "technology": ["tech", "software", "digital", "cloud", "online", "internet", "ai",
+                  "artificial intelligence", "saas", "platform", "app", "semiconductor",
+                  "computing", "cybersecurity", "data", "it ", "telecom"],
+
+    "finance": ["bank", "financ", "invest", "capital", "fund", "asset", "wealth",
+               "insurance", "loan", "credit", "payment", "fintech", "trading"],
+
+    "retail": ["retail", "store", "consumer", "shop", "brand", "e-commerce", "ecommerce",
+              "merchandise", "product", "fashion", "food", "grocery", "chain"]
+}
+
+# Same matches as searching r"merger|acquisition|acquire[sd]?|takeover|buy[s]? out|deal|combines with":
+# an optional suffix can't change whether a search hits, so these reduce to substrings
+MA_KEYWORDS = ("merger", "acquisition", "acquire", "takeover", "buy out", "buys out", "deal", "combines with")
+
+# Built once at import. Keyword checks are plain substring tests: CPython's
+# `in` is a C-level search that beats a keyword-alternation regex ~3x here
+# (see benchmarks/bench_categorizer.py)
+_CATEGORY_KEYWORDS = tuple((category, tuple(keywords)) for category, keywords in CATEGORY_KEYWORDS.items())
+
+
+def _normalize(title, description):
+    title_lower = title.lower() if title else ""
+    desc_lower = description.lower() if description else ""
+    return f"{title_lower} {desc_lower}"
+
+
+def _categorize_text(text):
+    for category, keywords in _CATEGORY_KEYWORDS:
+        for keyword in keywords:
+            if keyword in text:
+                return category
+    return "other"
+
+
+def categorize_article(title, description):
+    return _categorize_text(_normalize(title, description))
+
+
+def _is_ma_text(text):
+    for keyword in MA_KEYWORDS:
+        if keyword in text:
+            return True
+    return False
+
+
+def is_ma_article(title, description):
+    return _is_ma_text(_normalize(title, description))
+
+
+def categorize_articles(articles):
+    """
+    Batch API over NewsAPI-style dicts with title/description.
+    Returns one category per article, or None for articles that aren't M&A related.
+    """
+    categories = []
+    for article in articles:
+        # One normalized text serves both the M&A filter and the category scan
+        text = _normalize(article.get("title", ""), article.get("description", ""))
+        categories.append(_categorize_text(text) if _is_ma_text(text) else None)
+    return categories
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from supabase import Client, ClientOptions, create_client
+
+from services.metrics import register_collector, upstream
+
+load_dotenv()
+
+logger = logging.getLogger("sentilyst")
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+DB_MAX_WORKERS = int(os.getenv("DB_MAX_WORKERS", "16"))
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "10"))
+
+# One client for the whole process so its HTTP connections are reused
+supabase: Client = create_client(
+    SUPABASE_URL, SUPABASE_KEY, options=ClientOptions(postgrest_client_timeout=DB_TIMEOUT)
+)
+
+_executor = ThreadPoolExecutor(max_workers=DB_MAX_WORKERS, thread_name_prefix="db")
+
+
+class LatencyStats:
+    """Per-operation call count, error count and latency totals."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, name, seconds, error=False):
+        with self._lock:
+            entry = self._stats.setdefault(name, {"count": 0, "errors": 0, "total_s": 0.0, "max_s": 0.0})
+            entry["count"] += 1
+            entry["errors"] += int(error)
+            entry["total_s"] += seconds
+            entry["max_s"] = max(entry["max_s"], seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: {**entry, "avg_s": entry["total_s"] / entry["count"] if entry["count"] else 0.0}
+                for name, entry in self._stats.items()
+            }
+
+
+db_stats = LatencyStats()
+
+
+def _db_metrics():
+    stats = db_stats.snapshot()
+    lines = []
+    for metric, field, kind, help in (
+        ("sentilyst_db_calls_total", "count", "counter", "Supabase calls per operation."),
+        ("sentilyst_db_errors_total", "errors", "counter", "Failed or timed out Supabase calls per operation."),
+        ("sentilyst_db_seconds_total", "total_s", "counter", "Total Supabase time per operation."),
+        ("sentilyst_db_max_seconds", "max_s", "gauge", "Slowest Supabase call per operation."),
+    ):
+        lines += [f"# HELP {metric} {help}", f"# TYPE {metric} {kind}"]
+        lines += [f'{metric}{{operation="{name}"}} {entry[field]}' for name, entry in stats.items()]
+    return lines
+
+
+register_collector(_db_metrics)
+
+
+async def execute(query, name="query", timeout=DB_TIMEOUT):
+    """
+    Run a PostgREST query builder's blocking .execute() on the bounded DB
+    thread pool so the event loop keeps serving other requests.
+    """
+    started = time.perf_counter()
+    error = False
+    try:
+        loop = asyncio.get_running_loop()
+        with upstream("supabase"):
+            return await asyncio.wait_for(loop.run_in_executor(_executor, query.execute), timeout)
+    except asyncio.TimeoutError:
+        error = True
+        logger.warning(f"Supabase {name} timed out after {timeout}s")
+        raise HTTPException(status_code=504, detail="Database timeout")
+    except Exception:
+        error = True
+        raise
+    finally:
+        db_stats.record(name, time.perf_counter() - started, error)
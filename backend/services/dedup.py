@@ -0,0 +1,129 @@
+import os
+import re
+import zlib
+
+import numpy as np
+
+# off: score every item | count: score one item per duplicate group, duplicates
+# reuse its result and still count | exclude: as count, but duplicates are left
+# out of sentiment_count and risk_level
+DEDUP_MODE = os.getenv("DEDUP_MODE", "count")
+# Minimum Jaccard similarity of word-bigram sets for two items to be duplicates
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+
+MINHASH_PERMUTATIONS = 64
+# 16 bands of 4 rows: pairs above ~0.5 similarity almost always share a band,
+# so the exact Jaccard check below, not LSH, decides what is a duplicate
+LSH_BANDS = 16
+_ROWS_PER_BAND = MINHASH_PERMUTATIONS // LSH_BANDS
+_PRIME = (1 << 61) - 1
+
+_rng = np.random.default_rng(20240601)
+_PERM_A = _rng.integers(1, 1 << 32, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 1 << 32, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+_NON_WORD = re.compile(r"[^\w$%]+")
+
+
+def normalize(text):
+    return " ".join(_NON_WORD.sub(" ", text.lower()).split())
+
+
+def shingles(normalized):
+    """Word bigrams; a one-word text is its own shingle."""
+    words = normalized.split()
+    if len(words) < 2:
+        return frozenset(words)
+    return frozenset(f"{a} {b}" for a, b in zip(words, words[1:]))
+
+
+def _signature(shingle_set):
+    hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingle_set), dtype=np.uint64, count=len(shingle_set))
+    # (a * x + b) stays below 2**64 because a, b and x are all 32-bit
+    permuted = (hashes[:, None] * _PERM_A + _PERM_B) % _PRIME
+    return permuted.min(axis=0)
+
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b)
+
+
+def find_representatives(texts, threshold=DEDUP_THRESHOLD):
+    """
+    For each text, the index of the first earlier text it duplicates (itself
+    if none). Texts that normalize to the same string are exact duplicates;
+    otherwise MinHash LSH proposes candidates and their bigram Jaccard
+    similarity must reach `threshold`.
+    """
+    representatives = []
+    exact = {}
+    buckets = {}
+    shingle_sets = {}
+
+    for i, text in enumerate(texts):
+        normalized = normalize(text)
+        if normalized in exact:
+            representatives.append(exact[normalized])
+            continue
+        exact[normalized] = i
+
+        current = shingles(normalized)
+        if not current:
+            representatives.append(i)
+            continue
+
+        signature = _signature(current)
+        bands = [
+            (band, signature[band * _ROWS_PER_BAND:(band + 1) * _ROWS_PER_BAND].tobytes())
+            for band in range(LSH_BANDS)
+        ]
+
+        match = None
+        seen = set()
+        for key in bands:
+            for candidate in buckets.get(key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                if _jaccard(current, shingle_sets[candidate]) >= threshold and (match is None or candidate < match):
+                    match = candidate
+
+        if match is not None:
+            representatives.append(match)
+            exact[normalized] = match
+            continue
+
+        representatives.append(i)
+        shingle_sets[i] = current
+        for key in bands:
+            buckets.setdefault(key, []).append(i)
+
+    return representatives
+
+
+def collapse(texts, mode=DEDUP_MODE, threshold=DEDUP_THRESHOLD):
+    """
+    Returns (unique_texts, index, counted): `unique_texts[index[i]]` is the
+    text scored for `texts[i]`, and `counted` masks the items that should
+    enter the aggregates.
+    """
+    if mode == "off" or not texts:
+        return list(texts), np.arange(len(texts), dtype=np.int64), np.ones(len(texts), dtype=bool)
+    if mode not in ("count", "exclude"):
+        raise ValueError(f"Unknown DEDUP_MODE: {mode!r}")
+
+    representatives = find_representatives(texts, threshold)
+    positions = {}
+    unique_texts = []
+    index = np.empty(len(texts), dtype=np.int64)
+    for i, rep in enumerate(representatives):
+        if rep not in positions:
+            positions[rep] = len(unique_texts)
+            unique_texts.append(texts[rep])
+        index[i] = positions[rep]
+
+    if mode == "exclude":
+        counted = np.array([rep == i for i, rep in enumerate(representatives)], dtype=bool)
+    else:
+        counted = np.ones(len(texts), dtype=bool)
+    return unique_texts, index, counted
@@ -1,14 +1,16 @@
 import os
-import requests
 from dotenv import load_dotenv
 
+from services.http_client import get_client
+from services.metrics import upstream
+
 load_dotenv()
 
 BREVO_API_KEY = os.getenv("BREVO_API_KEY")
 SENDER_EMAIL = os.getenv("SENDER_EMAIL")
 SENDER_NAME = os.getenv("SENDER_NAME")
 
-def send_email_otp(recipient: str, otp: str):
+async def send_email_otp(recipient: str, otp: str):
     url = "https://api.brevo.com/v3/smtp/email"
     
     payload = {
@@ -71,9 +73,10 @@ def send_email_otp(recipient: str, otp: str):
         "content-type": "application/json"
     }
 
-    response = requests.post(url, json=payload, headers=headers)
-    
-    if response.status_code != 201:
-        raise Exception(f"Failed to send OTP email. Response: {response.text}")
-    else:
-        print(f"OTP sent successfully")
+    with upstream("brevo"):
+        response = await get_client().post(url, json=payload, headers=headers)
+
+        if response.status_code != 201:
+            raise Exception(f"Failed to send OTP email. Response: {response.text}")
+        else:
+            print(f"OTP sent successfully")
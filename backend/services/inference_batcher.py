@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from services.sentiment_analysis import analyze_batch_arrays
+from services.inference_pool import pool
+from services.metrics import inference_batch_seconds, inference_batch_size, inference_queue_wait_seconds
+
+logger = logging.getLogger("sentilyst")
+
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "64"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+
+
+def empty_results():
+    """What the default inference functions return for no texts: (label_ids, confidences)."""
+    return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+
+
+def _slice(results, start, stop):
+    if isinstance(results, tuple):
+        return tuple(part[start:stop] for part in results)
+    return results[start:stop]
+
+
+class InferenceBatcher:
+    """
+    Coalesces texts from concurrent requests into shared model batches.
+
+    Callers await `submit(texts)`; a single worker task drains the queue,
+    merges pending jobs until `max_batch_size` texts are collected or
+    `max_wait_ms` has passed since the first job arrived, runs the model on
+    a dedicated thread and hands each caller back its own slice of results.
+    Up to `concurrency` batches run at once (one per inference worker process).
+    `infer_fn` may return a list or a tuple of aligned arrays.
+    """
+
+    def __init__(
+        self,
+        infer_fn,
+        max_batch_size=INFERENCE_MAX_BATCH_SIZE,
+        max_wait_ms=INFERENCE_MAX_WAIT_MS,
+        concurrency=1,
+        empty_fn=empty_results,
+    ):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.concurrency = max(1, concurrency)
+        self._infer_fn = infer_fn
+        self._empty_fn = empty_fn
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="inference")
+        self._queue = None
+        self._worker = None
+        self._carry = None
+        self._slots = None
+        # Jobs taken off the queue for the batch being collected
+        self._collecting = []
+        # Dispatched _process tasks, awaited on stop
+        self._inflight = set()
+
+    def start(self):
+        if self._worker is not None and not self._worker.done():
+            return
+        self._queue = asyncio.Queue()
+        self._carry = None
+        self._collecting = []
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Let dispatched batches finish, then fail every job that never reached the model."""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+        # Fail anything still waiting so callers don't hang on shutdown
+        pending = list(self._collecting)
+        if self._carry is not None:
+            pending.append(self._carry)
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, fut, _ in pending:
+            if not fut.done():
+                fut.set_exception(RuntimeError("Inference batcher stopped"))
+        self._collecting = []
+        self._carry = None
+
+    async def submit(self, texts):
+        """Queue texts for inference and wait for this caller's slice of the results."""
+        texts = list(texts)
+        if not texts:
+            # Nothing to score; don't touch the model (it may not be loaded yet)
+            return self._empty_fn()
+        self.start()
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((texts, fut, time.perf_counter()))
+        return await fut
+
+    async def _next_job(self, deadline=None):
+        if self._carry is not None:
+            job, self._carry = self._carry, None
+            return job
+        if deadline is None:
+            return await self._queue.get()
+        if not self._queue.empty():
+            return self._queue.get_nowait()
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            raise asyncio.TimeoutError
+        return await asyncio.wait_for(self._queue.get(), remaining)
+
+    async def _collect(self):
+        # Collected jobs live on self so stop() can fail them if cancelled mid-collection
+        self._collecting = jobs = [await self._next_job()]
+        size = len(jobs[0][0])
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+
+        while size < self.max_batch_size:
+            try:
+                job = await self._next_job(deadline)
+            except asyncio.TimeoutError:
+                break
+            if size + len(job[0]) > self.max_batch_size:
+                # Keep the overflowing job for the next batch instead of splitting it
+                self._carry = job
+                break
+            jobs.append(job)
+            size += len(job[0])
+        self._collecting = []
+        return jobs
+
+    async def _run(self):
+        while True:
+            # Wait for a free slot before collecting so the queue keeps filling
+            # while every worker is busy
+            await self._slots.acquire()
+            try:
+                jobs = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            jobs = [job for job in jobs if not job[1].done()]
+            if not jobs:
+                self._slots.release()
+                continue
+            task = asyncio.get_running_loop().create_task(self._process(jobs))
+            self._inflight.add(task)
+            task.add_done_callback(self._process_done)
+
+    def _process_done(self, task):
+        self._inflight.discard(task)
+        self._slots.release()
+
+    async def _process(self, jobs):
+        texts = [text for job_texts, _, _ in jobs for text in job_texts]
+        started = time.perf_counter()
+        for _, _, enqueued in jobs:
+            inference_queue_wait_seconds.observe(started - enqueued)
+        inference_batch_size.observe(len(texts))
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self._executor, self._infer_fn, texts)
+        except Exception as e:
+            logger.exception("Batched inference failed")
+            for _, fut, _ in jobs:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        finally:
+            inference_batch_seconds.observe(time.perf_counter() - started)
+
+        offset = 0
+        for job_texts, fut, _ in jobs:
+            n = len(job_texts)
+            if not fut.done():
+                fut.set_result(_slice(results, offset, offset + n))
+            offset += n
+
+if pool.enabled:
+    batcher = InferenceBatcher(partial(pool.infer, batch_size=INFERENCE_MAX_BATCH_SIZE), concurrency=pool.workers)
+else:
+    batcher = InferenceBatcher(partial(analyze_batch_arrays, batch_size=INFERENCE_MAX_BATCH_SIZE))
@@ -0,0 +1,90 @@
+import gc
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from services import sentiment_analysis
+
+logger = logging.getLogger("sentilyst")
+
+# 0 keeps inference in the API process on the batcher thread
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+INFERENCE_THREADS_PER_WORKER = int(
+    os.getenv("INFERENCE_THREADS_PER_WORKER") or max(1, (os.cpu_count() or 1) // max(1, INFERENCE_WORKERS))
+)
+
+
+def _init_worker(num_threads):
+    import torch
+    torch.set_num_threads(num_threads)
+
+
+def _warmup_worker(_):
+    sentiment_analysis.run_model(["test"])
+    return os.getpid()
+
+
+class InferencePool:
+    """
+    Runs the model in forked worker processes.
+
+    The parent has already loaded the weights when the pool starts, so every
+    child sees them through copy-on-write pages instead of loading its own
+    copy. Workers are forked before the parent runs any inference because
+    OpenMP thread pools do not survive a fork, and `start()` must run on the
+    main thread before other threads exist, since locks held by other threads
+    (torch, logging, HTTP clients) would stay locked forever in the children.
+    The per-text cache stays in the parent; only cache misses are sent to the
+    workers.
+    """
+
+    def __init__(self, workers=INFERENCE_WORKERS, threads_per_worker=INFERENCE_THREADS_PER_WORKER):
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.workers > 0
+
+    def start(self):
+        with self._lock:
+            if self.enabled and self._executor is None:
+                self._start()
+
+    def _start(self):
+        # Workers inherit whatever the parent has loaded
+        sentiment_analysis.load_model()
+        # Move current objects out of the GC's view so collections in the
+        # children don't touch (and copy) the parent's pages
+        gc.freeze()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_worker,
+            initargs=(self.threads_per_worker,),
+        )
+        # With fork, the first submit launches every worker at once
+        pids = set(self._executor.map(_warmup_worker, range(self.workers)))
+        logger.info(f"Inference pool started: {self.workers} workers x {self.threads_per_worker} threads ({len(pids)} warmed)")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def run_model(self, texts, batch_size=32):
+        """Blocking call that runs `texts` on one worker; used from batcher threads."""
+        if self._executor is None:
+            # Forking here, from a batcher thread, could deadlock the children
+            raise RuntimeError("Inference pool is not started; call pool.start() on the main thread at startup")
+        return self._executor.submit(sentiment_analysis.run_model, texts, batch_size).result()
+
+    def infer(self, texts, batch_size=32):
+        return sentiment_analysis.analyze_batch_arrays(texts, batch_size, model_fn=self.run_model)
+
+
+pool = InferencePool()
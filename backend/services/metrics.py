@@ -0,0 +1,178 @@
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Set to 1 to send a Server-Timing header with per-stage durations
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+_registry = []
+_collectors = []
+
+# Stage timings of the current request, read by MetricsMiddleware for Server-Timing
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labelvalues, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format."""
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # labelvalues -> [per-bucket counts (+Inf last), sum, count]
+        self._values = {}
+        _registry.append(self)
+
+    def observe(self, value, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            if entry is None:
+                entry = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labelvalues, (counts, total, count) in self._values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labelnames, labelvalues, [("le", _format_value(bound))])
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, labelvalues)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def register_collector(collect):
+    """`collect()` returns exposition lines computed at scrape time (e.g. from existing stats)."""
+    _collectors.append(collect)
+
+
+def render():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        lines.extend(collect())
+    return "\n".join(lines) + "\n"
+
+
+request_seconds = Histogram(
+    "sentilyst_http_request_duration_seconds", "HTTP request latency.", ("method", "route", "status")
+)
+stage_seconds = Histogram(
+    "sentilyst_stage_duration_seconds", "Time spent in each stage of a controller.", ("controller", "stage")
+)
+upstream_seconds = Histogram(
+    "sentilyst_upstream_duration_seconds", "Latency of calls to external services.", ("upstream",)
+)
+upstream_errors = Counter(
+    "sentilyst_upstream_errors_total", "Failed or timed out calls to external services.", ("upstream",)
+)
+inference_batch_size = Histogram(
+    "sentilyst_inference_batch_size", "Texts per coalesced model batch.", buckets=BATCH_SIZE_BUCKETS
+)
+inference_queue_wait_seconds = Histogram(
+    "sentilyst_inference_queue_wait_seconds", "Time a request waited in the batcher before its batch started."
+)
+inference_batch_seconds = Histogram(
+    "sentilyst_inference_batch_duration_seconds", "Time to run one coalesced model batch."
+)
+
+
+def record_timing(name, seconds):
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+@contextmanager
+def stage(controller, name):
+    """Time a block as one stage of `controller`; also reported in Server-Timing."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        stage_seconds.observe(elapsed, controller, name)
+        record_timing(name, elapsed)
+
+
+@contextmanager
+def upstream(name):
+    """Time a call to an external service, counting exceptions (including timeouts) as errors."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        upstream_errors.inc(name)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        upstream_seconds.observe(elapsed, name)
+        record_timing(name, elapsed)
+
+
+def start_request_timings():
+    """Begin collecting stage timings for the current request; returns the list and a reset token."""
+    timings = []
+    return timings, _request_timings.set(timings)
+
+
+def end_request_timings(token):
+    _request_timings.reset(token)
+
+
+def server_timing_header(timings, total=None):
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
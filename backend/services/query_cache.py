@@ -0,0 +1,167 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger("sentilyst")
+
+QUERY_CACHE_BACKEND = os.getenv("QUERY_CACHE_BACKEND", "memory")  # memory | sqlite
+QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH", "./query_cache.sqlite3")
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1000"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "300"))
+QUERY_CACHE_STALE_TTL = float(os.getenv("QUERY_CACHE_STALE_TTL", "900"))
+
+
+class MemoryBackend:
+    """Per-process LRU store of key -> (value, stored_at)."""
+
+    blocking = False
+
+    def __init__(self, maxsize=QUERY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is not None:
+            self._data.move_to_end(key)
+        return entry
+
+    def set(self, key, value, stored_at):
+        self._data[key] = (value, stored_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+class SqliteBackend:
+    """
+    Local SQLite store so every worker process in a container shares one cache.
+    Values must be JSON serializable.
+    """
+
+    # Disk I/O; QueryCache calls it from a worker thread
+    blocking = True
+
+    def __init__(self, path=QUERY_CACHE_PATH, max_age=QUERY_CACHE_TTL + QUERY_CACHE_STALE_TTL):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM query_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value, stored_at):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_cache (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), stored_at),
+            )
+            self._conn.execute("DELETE FROM query_cache WHERE stored_at < ?", (stored_at - self.max_age,))
+
+
+class QueryCache:
+    """
+    TTL cache with stale-while-revalidate and single-flight computation.
+
+    Fresh entries (younger than `ttl`) are returned as is. Stale entries (up
+    to `ttl + stale_ttl` old) are returned immediately while one background
+    task recomputes them. Misses wait on a shared task, so concurrent callers
+    for the same key trigger exactly one computation.
+    """
+
+    def __init__(self, backend, ttl=QUERY_CACHE_TTL, stale_ttl=QUERY_CACHE_STALE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._inflight = {}
+
+    async def get_or_compute(self, key, compute):
+        """`compute` is a zero-argument callable returning an awaitable of the value."""
+        if self.ttl > 0:
+            entry = await self._backend_get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = time.time() - stored_at
+                if age < self.ttl:
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    self._refresh(key, compute)
+                    return value
+
+        # Shield so one cancelled caller doesn't cancel the shared computation
+        return await asyncio.shield(self._refresh(key, compute))
+
+    async def peek(self, key):
+        """Return the value for `key` if it is fresh, without computing anything."""
+        if self.ttl <= 0:
+            return None
+        entry = await self._backend_get(key)
+        if entry is not None and time.time() - entry[1] < self.ttl:
+            return entry[0]
+        return None
+
+    async def put(self, key, value):
+        """Store a value computed outside get_or_compute (e.g. by a batch job)."""
+        if self.ttl > 0:
+            await self._backend_set(key, value, time.time())
+
+    async def _backend_get(self, key):
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.backend.get, key)
+        return self.backend.get(key)
+
+    async def _backend_set(self, key, value, stored_at):
+        if self.backend.blocking:
+            await asyncio.to_thread(self.backend.set, key, value, stored_at)
+        else:
+            self.backend.set(key, value, stored_at)
+
+    def _refresh(self, key, compute):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._compute(key, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return task
+
+    async def _compute(self, key, compute):
+        value = await compute()
+        if self.ttl > 0:
+            await self._backend_set(key, value, time.time())
+        return value
+
+    def _done(self, key, task):
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Query cache refresh failed for {key!r}: {task.exception()!r}")
+
+
+def query_cache_key(query):
+    """Queries differing only in case and whitespace share one entry (and one rollup series)."""
+    return " ".join(query.split()).lower()
+
+
+def create_backend(name=QUERY_CACHE_BACKEND):
+    if name == "sqlite":
+        return SqliteBackend()
+    if name == "memory":
+        return MemoryBackend()
+    raise ValueError(f"Unknown QUERY_CACHE_BACKEND: {name!r}")
+
+
+query_cache = QueryCache(create_backend())
@@ -0,0 +1,246 @@
+"""
+Hourly and daily sentiment rollups per (user, query) for trend charts.
+
+Saved analyses are folded into per-bucket sums (analyses, positive,
+negative, risk_level, total_results) in memory and flushed to the
+`analysis_rollups` table in one upsert per interval, so repeated analyses
+of the same query cost one write per bucket. A trend range is then read
+from at most one row per bucket, however long the history is.
+
+Only rows that are in analyzed_data are counted: with write-behind on,
+saves reach the rollups when their bulk insert succeeds. The table is
+created by backend/migrations/003_analysis_rollups.sql. Rebuild from the
+raw rows (e.g. after creating the table) with:
+
+    python -m services.rollups
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+
+from services.db import execute, supabase
+from services.query_cache import query_cache_key
+
+logger = logging.getLogger("sentilyst")
+
+ROLLUPS_ENABLED = os.getenv("ROLLUPS_ENABLED", "1") == "1"
+ROLLUP_FLUSH_INTERVAL = float(os.getenv("ROLLUP_FLUSH_INTERVAL", "2.0"))
+
+ROLLUP_TABLE = "analysis_rollups"
+GRANULARITIES = ("hour", "day")
+SUM_FIELDS = ("analyses", "positive_sum", "negative_sum", "risk_sum", "volume")
+CONFLICT_COLUMNS = "user_id,query_key,granularity,bucket"
+
+
+def bucket_of(created_at, granularity):
+    """Truncate an analyzed_data created_at (IST, ISO format) to its hour or day."""
+    if granularity == "hour":
+        return f"{created_at[:13]}:00:00"
+    return created_at[:10]
+
+
+def bucket_range(start, end, granularity):
+    """Inclusive (low, high) bucket bounds for ISO date or datetime strings; None leaves a side open."""
+    low = high = None
+    if start:
+        low = bucket_of(start if len(start) >= 13 or granularity == "day" else f"{start[:10]}T00", granularity)
+    if end:
+        high = bucket_of(end if len(end) >= 13 or granularity == "day" else f"{end[:10]}T23", granularity)
+    return low, high
+
+
+def deltas_for(row, sign=1):
+    """The per-bucket increments one analyzed_data row contributes."""
+    values = (
+        sign,
+        sign * float(row.get("positive") or 0.0),
+        sign * float(row.get("negative") or 0.0),
+        sign * float(row.get("risk_level") or 0.0),
+        sign * int(row.get("total_results") or 0),
+    )
+    key = query_cache_key(row["query"])
+    # Saves carry the token's string id, deleted rows the database's uuid; both must land on one key
+    user_id = str(row["user_id"])
+    for granularity in GRANULARITIES:
+        yield (user_id, key, granularity, bucket_of(row["created_at"], granularity)), values
+
+
+def _add(target, key, values):
+    current = target.get(key)
+    target[key] = values if current is None else tuple(a + b for a, b in zip(current, values))
+
+
+def rollup_row(key, sums, updated_at):
+    user_id, bucket_key, granularity, bucket = key
+    return {
+        "user_id": user_id,
+        "query_key": bucket_key,
+        "granularity": granularity,
+        "bucket": bucket,
+        **dict(zip(SUM_FIELDS, sums)),
+        "updated_at": updated_at,
+    }
+
+
+def trend_point(bucket, sums):
+    analyses, positive_sum, negative_sum, risk_sum, volume = sums
+    return {
+        "bucket": bucket,
+        "analyses": analyses,
+        "positive": round(positive_sum / analyses, 2),
+        "negative": round(negative_sum / analyses, 2),
+        "risk_level": round(risk_sum / analyses, 2),
+        "volume": volume,
+    }
+
+
+class RollupWriter:
+    """
+    Accumulates rollup increments and merges them into the table.
+
+    A flush reads the current rows for the touched buckets, adds the
+    pending increments and upserts the result. Flushes are serialized in
+    this process; increments from other processes that land on the same
+    bucket between that read and write can be lost, which a rebuild fixes.
+    Failed flushes keep their increments for the next one.
+    """
+
+    def __init__(self, table=ROLLUP_TABLE, flush_interval=ROLLUP_FLUSH_INTERVAL):
+        self.table = table
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._worker = None
+        self._flush_lock = None
+
+    def start(self):
+        if self._worker is not None:
+            return
+        self._flush_lock = asyncio.Lock()
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop, letting a flush in progress finish, and write out what is pending."""
+        if self._worker is None:
+            return
+        # A flush cancelled after its upsert landed would apply its increments twice
+        async with self._flush_lock:
+            self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        if self._pending and not await self.flush():
+            logger.error(f"Shutting down with {len(self._pending)} unsaved rollup buckets")
+
+    def add(self, rows, sign=1):
+        """Fold analyzed_data rows in (sign=-1 takes deleted rows back out)."""
+        for row in rows:
+            for key, values in deltas_for(row, sign):
+                _add(self._pending, key, values)
+
+    def pending_for(self, user_id, key, granularity):
+        """{bucket: sums} not yet flushed for one trend, so reads see the latest saves."""
+        return {
+            bucket: values
+            for (pending_user, pending_key, pending_granularity, bucket), values in self._pending.items()
+            if pending_user == user_id and pending_key == key and pending_granularity == granularity
+        }
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self._pending:
+                await self.flush()
+
+    async def flush(self):
+        """Merge everything pending into the table; returns False if it was put back."""
+        async with self._flush_lock:
+            batch, self._pending = self._pending, {}
+            if not batch:
+                return True
+            try:
+                current = await self._current_sums(batch)
+                updated_at = datetime.now(timezone.utc).isoformat()
+                rows = [
+                    rollup_row(key, tuple(a + b for a, b in zip(current.get(key, (0, 0.0, 0.0, 0.0, 0)), values)), updated_at)
+                    for key, values in batch.items()
+                ]
+                await execute(
+                    supabase.table(self.table).upsert(rows, on_conflict=CONFLICT_COLUMNS), f"{self.table}.upsert"
+                )
+                return True
+            except Exception as e:
+                logger.error(f"Flushing {len(batch)} rollup buckets failed, will retry later: {e!r}")
+                self._restore(batch)
+                return False
+            except BaseException:
+                # Cancelled mid-flush: keep the increments rather than dropping them
+                self._restore(batch)
+                raise
+
+    def _restore(self, batch):
+        for key, values in batch.items():
+            _add(self._pending, key, values)
+
+    async def _current_sums(self, batch):
+        """Stored sums for the batch's buckets, one select per (user, granularity)."""
+        groups = {}
+        for user_id, key, granularity, bucket in batch:
+            keys, buckets = groups.setdefault((user_id, granularity), (set(), set()))
+            keys.add(key)
+            buckets.add(bucket)
+
+        current = {}
+        for (user_id, granularity), (keys, buckets) in groups.items():
+            response = await execute(
+                supabase.table(self.table)
+                .select("query_key, bucket, " + ", ".join(SUM_FIELDS))
+                .eq("user_id", user_id)
+                .eq("granularity", granularity)
+                .in_("query_key", sorted(keys))
+                .in_("bucket", sorted(buckets)),
+                f"{self.table}.select",
+            )
+            for row in response.data or []:
+                current[(user_id, row["query_key"], granularity, row["bucket"])] = tuple(row[f] for f in SUM_FIELDS)
+        return current
+
+
+rollup_writer = RollupWriter()
+
+
+async def rebuild_rollups(page_size=1000):
+    """Recompute every rollup from analyzed_data, overwriting the stored sums."""
+    totals = {}
+    last = None
+    while True:
+        builder = supabase.table("analyzed_data").select(
+            "id, user_id, query, positive, negative, risk_level, total_results, created_at"
+        )
+        if last is not None:
+            builder = builder.gt("id", last)
+        response = await execute(builder.order("id").limit(page_size), "analyzed_data.select_rollup")
+        rows = response.data or []
+        for row in rows:
+            if row.get("user_id") and row.get("query") and row.get("created_at"):
+                for key, values in deltas_for(row):
+                    _add(totals, key, values)
+        if len(rows) < page_size:
+            break
+        last = rows[-1]["id"]
+
+    updated_at = datetime.now(timezone.utc).isoformat()
+    rows = [rollup_row(key, sums, updated_at) for key, sums in totals.items()]
+    for start in range(0, len(rows), page_size):
+        await execute(
+            supabase.table(ROLLUP_TABLE).upsert(rows[start:start + page_size], on_conflict=CONFLICT_COLUMNS),
+            f"{ROLLUP_TABLE}.upsert",
+        )
+    return len(rows)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    logger.info(f"Rebuilt {asyncio.run(rebuild_rollups())} rollup buckets")
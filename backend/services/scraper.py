@@ -1,33 +1,82 @@
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import logging
+import os
 import feedparser
 from urllib.parse import quote_plus
+from services.http_client import get_client
+from services.metrics import upstream
 
-def scrape_reddit(query):
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
+logger = logging.getLogger("sentilyst")
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+# Per-source deadlines (seconds) for the async pipeline
+REDDIT_DEADLINE = float(os.getenv("REDDIT_DEADLINE", "8"))
+GOOGLE_NEWS_DEADLINE = float(os.getenv("GOOGLE_NEWS_DEADLINE", "8"))
+
+
+def _reddit_url(query):
     encoded_query = quote_plus(query)
-    url = f"https://www.reddit.com/search.json?q={encoded_query}&limit=50"
-    try:
-        res = requests.get(url, headers=headers, timeout=10)
-        res.raise_for_status()
-        posts = res.json()["data"]["children"]
-        results = [f"{p['data']['title']} - https://reddit.com{p['data']['permalink']}" for p in posts]
-        # print(f"Reddit scraped: {len(results)} posts")
-        return results
-    except Exception as e:
-        # print(f"Reddit scraping failed: {e}")
-        return []
+    return f"https://www.reddit.com/search.json?q={encoded_query}&limit=50"
 
-def scrape_google_news(query):
+def _google_news_url(query):
     encoded_query = quote_plus(f"{query} mergers acquisition")
-    url = f"https://news.google.com/rss/search?q={encoded_query}&hl=en-US&gl=US&ceid=US:en"
+    return f"https://news.google.com/rss/search?q={encoded_query}&hl=en-US&gl=US&ceid=US:en"
+
+def _parse_reddit(payload):
+    posts = payload["data"]["children"]
+    return [f"{p['data']['title']} - https://reddit.com{p['data']['permalink']}" for p in posts]
+
+def _parse_google_news(feed):
+    return [f"{entry.title} - {entry.link}" for entry in feed.entries[:50]]
+
+
+async def scrape_reddit_async(query):
+    res = await get_client().get(_reddit_url(query), headers=HEADERS, timeout=REDDIT_DEADLINE)
+    res.raise_for_status()
+    return _parse_reddit(res.json())
+
+async def scrape_google_news_async(query):
+    res = await get_client().get(
+        _google_news_url(query), headers=HEADERS, timeout=GOOGLE_NEWS_DEADLINE, follow_redirects=True
+    )
+    res.raise_for_status()
+    # feedparser is pure CPU work; keep it off the event loop
+    feed = await asyncio.to_thread(feedparser.parse, res.content)
+    return _parse_google_news(feed)
+
+
+# name -> (scraper, deadline in seconds)
+SOURCES = {
+    "reddit": (scrape_reddit_async, REDDIT_DEADLINE),
+    "google_news": (scrape_google_news_async, GOOGLE_NEWS_DEADLINE),
+}
+
+
+async def scrape_source(name, query, partial=True):
+    """
+    Run a single source under its deadline.
+
+    With `partial=True` a failing or slow source yields an empty list so the
+    other sources can still be returned; otherwise the error propagates.
+    """
+    scraper, deadline = SOURCES[name]
     try:
-        feed = feedparser.parse(url)
-        results = [f"{entry.title} - {entry.link}" for entry in feed.entries[:50]]
-        # print(f"Google News scraped: {len(results)} articles")
-        return results
+        with upstream(name):
+            return await asyncio.wait_for(scraper(query), deadline)
     except Exception as e:
-        # print(f"Google News scraping failed: {e}")
+        if not partial:
+            raise
+        logger.warning(f"{name} scraping failed for {query!r}: {e!r}")
         return []
+
+
+async def scrape_all(query, partial=True):
+    """Scrape every source concurrently; returns (reddit_data, google_data)."""
+    reddit_data, google_data = await asyncio.gather(
+        scrape_source("reddit", query, partial),
+        scrape_source("google_news", query, partial),
+    )
+    return reddit_data, google_data
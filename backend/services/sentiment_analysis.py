@@ -1,49 +1,397 @@
-import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
+import numpy as np
+import hashlib
+import logging
 import os
+import threading
+import time
+from collections import OrderedDict
+
+from services.metrics import register_collector
 
 # Cache model locally to speed up deployments
 MODEL_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
 CACHE_DIR = os.getenv("HF_HOME", "./model_cache")
+# Optional pre-serialized (save_pretrained / safetensors) artifact baked into the image
+SENTIMENT_MODEL_PATH = os.getenv("SENTIMENT_MODEL_PATH")
+
+# Inference backend: torch (eager fp32) | torch-int8 (dynamic quantization) | onnx (ONNX Runtime)
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "torch")
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH") or os.path.join(CACHE_DIR, "onnx", "model.onnx")
+SENTIMENT_PARITY_CHECK = os.getenv("SENTIMENT_PARITY_CHECK", "0") == "1"
+
+# Token cap per text; headlines rarely need more than 64-128 tokens (model limit is 512)
+SENTIMENT_MAX_LENGTH = min(int(os.getenv("SENTIMENT_MAX_LENGTH", "128")), 512)
+
+# Per-text result cache: 0 size disables it, 0 TTL means entries never expire
+SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "10000"))
+SENTIMENT_CACHE_TTL = float(os.getenv("SENTIMENT_CACHE_TTL", "0"))
+CACHE_KEY_CHARS = 500
+
+logger = logging.getLogger("sentilyst")
+
+# Fixed headlines used to check that an optimized backend agrees with the eager model
+PARITY_CORPUS = [
+    "Microsoft completes acquisition of Activision Blizzard",
+    "Shares plunge after merger talks collapse",
+    "Regulators block the proposed takeover citing competition concerns",
+    "Company reports record quarterly profit and raises guidance",
+    "Investors cheer as the deal closes ahead of schedule",
+    "Layoffs expected following the acquisition",
+    "Analysts warn the buyout leaves the firm heavily indebted",
+    "Board unanimously approves the merger agreement",
+    "Lawsuit filed to stop the acquisition over fraud allegations",
+    "Stock hits all-time high on takeover rumors",
+    "CEO resigns amid accounting scandal",
+    "The combined company will be the largest in the industry",
+]
+
+
+def _model_source():
+    if SENTIMENT_MODEL_PATH and os.path.isdir(SENTIMENT_MODEL_PATH):
+        return SENTIMENT_MODEL_PATH, {"local_files_only": True}
+    return MODEL_NAME, {"cache_dir": CACHE_DIR}
+
+def _load_eager_model():
+    from transformers import AutoModelForSequenceClassification
+    source, kwargs = _model_source()
+    eager = AutoModelForSequenceClassification.from_pretrained(source, **kwargs)
+    eager.eval()
+    return eager
+
+
+class TorchBackend:
+    """Full-precision PyTorch eager inference."""
+    name = "torch"
+
+    def __init__(self, model):
+        self.model = model
+
+    def logits(self, inputs):
+        import torch
+        with torch.no_grad():
+            return self.model(**inputs).logits
+
+
+class QuantizedTorchBackend(TorchBackend):
+    """PyTorch with Linear layers dynamically quantized to int8 (quantized in place to save memory)."""
+    name = "torch-int8"
+
+    def __init__(self, model):
+        import torch
+        super().__init__(torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True))
+
+
+class OnnxBackend:
+    """ONNX Runtime on CPU. The model is exported to ONNX_MODEL_PATH on first use."""
+    name = "onnx"
+
+    def __init__(self, model, path=ONNX_MODEL_PATH):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise RuntimeError("SENTIMENT_BACKEND=onnx requires the onnxruntime package") from e
+
+        if not os.path.exists(path):
+            self.export(model, path)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    @staticmethod
+    def export(model, path):
+        import torch
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        dummy = tokenizer(["warmup"], return_tensors="pt")
+        axes = {0: "batch", 1: "sequence"}
+        torch.onnx.export(
+            model,
+            (dummy["input_ids"], dummy["attention_mask"]),
+            path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={"input_ids": axes, "attention_mask": axes, "logits": {0: "batch"}},
+            opset_version=14,
+        )
+
+    def logits(self, inputs):
+        import torch
+        feed = {
+            "input_ids": inputs["input_ids"].numpy(),
+            "attention_mask": inputs["attention_mask"].numpy(),
+        }
+        return torch.from_numpy(self.session.run(["logits"], feed)[0])
+
+
+BACKENDS = {
+    TorchBackend.name: TorchBackend,
+    QuantizedTorchBackend.name: QuantizedTorchBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+
+def create_backend(name, model):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown SENTIMENT_BACKEND {name!r}, expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](model)
+
+
+# Loaded lazily by load_model() so importing this module stays cheap
+tokenizer = None
+model = None
+backend = None
+
+# cold -> loading -> loaded -> ready (after warmup), or failed
+_status = "cold"
+_load_lock = threading.Lock()
+
+
+def model_status():
+    return _status
+
+def is_ready():
+    return _status == "ready"
 
-# Load tokenizer and model at module level (once)
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME, cache_dir=CACHE_DIR)
-model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME, cache_dir=CACHE_DIR)
-model.eval()
+def load_model():
+    """Load tokenizer, model and backend once; safe to call from any thread."""
+    global tokenizer, model, backend, _status
+    if backend is not None:
+        return
+    with _load_lock:
+        if backend is not None:
+            return
+        _status = "loading"
+        started = time.perf_counter()
+        try:
+            from transformers import AutoTokenizer
+            source, kwargs = _model_source()
+            loaded_tokenizer = AutoTokenizer.from_pretrained(source, **kwargs)
+            # run_model tokenizes once and pads per length bucket on purpose; skip the fast-tokenizer advice
+            loaded_tokenizer.deprecation_warnings["Asking-to-pad-a-fast-tokenizer"] = True
+            tokenizer = loaded_tokenizer
+            model = _load_eager_model()
+            backend = create_backend(SENTIMENT_BACKEND, model)
+        except Exception:
+            _status = "failed"
+            raise
+        _status = "loaded"
+        logger.info(f"Sentiment model loaded from {source} ({backend.name}) in {time.perf_counter() - started:.2f}s")
+
+
+class SentimentCache:
+    """Thread-safe LRU of text hash -> (label, confidence) with optional TTL."""
+
+    def __init__(self, maxsize, ttl=0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if not self.ttl or time.monotonic() - stored_at < self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+result_cache = SentimentCache(SENTIMENT_CACHE_SIZE, SENTIMENT_CACHE_TTL)
+
+
+def _cache_metrics():
+    stats = result_cache.stats()
+    return [
+        "# HELP sentilyst_sentiment_cache_hits_total Per-text sentiment cache hits.",
+        "# TYPE sentilyst_sentiment_cache_hits_total counter",
+        f"sentilyst_sentiment_cache_hits_total {stats['hits']}",
+        "# HELP sentilyst_sentiment_cache_misses_total Per-text sentiment cache misses.",
+        "# TYPE sentilyst_sentiment_cache_misses_total counter",
+        f"sentilyst_sentiment_cache_misses_total {stats['misses']}",
+        "# HELP sentilyst_sentiment_cache_entries Texts currently cached.",
+        "# TYPE sentilyst_sentiment_cache_entries gauge",
+        f"sentilyst_sentiment_cache_entries {stats['size']}",
+    ]
+
+
+register_collector(_cache_metrics)
+
+
+def cache_key(text):
+    """Hash of the whitespace-collapsed, lowercased (model is uncased) and truncated text."""
+    normalized = " ".join(text.split()).lower()[:CACHE_KEY_CHARS]
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+def cache_stats():
+    return result_cache.stats()
 
 def warmup_model():
     """Warm up model with dummy inference to avoid cold start"""
-    analyze_batch(["test"])
+    global _status
+    run_model(["test"])
+    if SENTIMENT_PARITY_CHECK:
+        report = check_backend_parity()
+        if report["mismatches"]:
+            logger.warning(f"Backend {report['backend']} disagrees with eager model: {report['mismatches']}")
+        else:
+            logger.info(f"Backend {report['backend']} matches eager model on {report['total']} texts")
+    _status = "ready"
+
+def check_backend_parity(corpus=PARITY_CORPUS):
+    """Compare the active backend's labels against a freshly loaded eager model."""
+    load_model()
+    reference = TorchBackend(_load_eager_model() if backend.name != TorchBackend.name else model)
+    expected_ids, expected_conf = run_model(corpus, runner=reference)
+    actual_ids, actual_conf = run_model(corpus)
+    mismatches = [
+        {"text": corpus[i], "expected": id2label(expected_ids[i]), "actual": id2label(actual_ids[i])}
+        for i in np.flatnonzero(expected_ids != actual_ids)
+    ]
+    return {
+        "backend": backend.name,
+        "total": len(corpus),
+        "matched": len(corpus) - len(mismatches),
+        "max_confidence_delta": float(np.abs(expected_conf - actual_conf).max(initial=0.0)),
+        "mismatches": mismatches,
+    }
+
+def id2label(label_id):
+    load_model()
+    return model.config.id2label[int(label_id)]
+
+def to_tuples(label_ids, confidences):
+    """Convert array results into the [(label, confidence), ...] form."""
+    load_model()
+    labels = [model.config.id2label[i] for i in label_ids.tolist()]
+    return list(zip(labels, confidences.tolist()))
 
 def analyze_text(text):
-    inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=512)
-    with torch.no_grad():
-        outputs = model(**inputs)
-        scores = torch.softmax(outputs.logits[0], dim=-1)
-        label = model.config.id2label[scores.argmax().item()]
-        confidence = scores.max().item()
-    return label, confidence
+    return to_tuples(*run_model([text]))[0]
 
-def analyze_batch(texts, batch_size=32):
-    results = []
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i + batch_size]
-        inputs = tokenizer(batch, return_tensors="pt", truncation=True, padding=True, max_length=512)
+def run_model(texts, batch_size=32, runner=None, max_length=None):
+    """Returns (label_ids, confidences) arrays aligned with `texts`."""
+    import torch
+    load_model()
+    runner = runner or backend
+    max_length = max_length or SENTIMENT_MAX_LENGTH
+    label_ids = np.zeros(len(texts), dtype=np.int64)
+    confidences = np.zeros(len(texts), dtype=np.float64)
+    if not texts:
+        return label_ids, confidences
+    input_ids = tokenizer(list(texts), truncation=True, max_length=max_length)["input_ids"]
+
+    # Bucket by token length so each batch is padded only to similar-length neighbours,
+    # then scatter results back into the original order
+    order = np.argsort([len(ids) for ids in input_ids], kind="stable")
+    for start in range(0, len(order), batch_size):
+        bucket = order[start:start + batch_size]
+        inputs = tokenizer.pad({"input_ids": [input_ids[i] for i in bucket]}, return_tensors="pt")
         with torch.no_grad():
-            outputs = model(**inputs)
-            scores = torch.softmax(outputs.logits, dim=-1)
-            for j in range(len(batch)):
-                label = model.config.id2label[scores[j].argmax().item()]
-                confidence = scores[j].max().item()
-                results.append((label, confidence))
-    return results
+            confidence, label_id = torch.softmax(runner.logits(inputs), dim=-1).max(dim=-1)
+        label_ids[bucket] = label_id.numpy()
+        confidences[bucket] = confidence.numpy()
+    return label_ids, confidences
+
+def analyze_batch_arrays(texts, batch_size=32, model_fn=None):
+    """
+    Cached batch inference returning (label_ids, confidences) arrays.
+    `model_fn(texts, batch_size)` computes cache misses (defaults to this process's model).
+    """
+    load_model()
+    model_fn = model_fn or run_model
+    if result_cache.maxsize <= 0:
+        return model_fn(texts, batch_size)
+
+    label2id = model.config.label2id
+    label_ids = np.zeros(len(texts), dtype=np.int64)
+    confidences = np.zeros(len(texts), dtype=np.float64)
+
+    # Only send each distinct uncached text to the model once
+    missing = {}
+    keys = [cache_key(text) for text in texts]
+    for i, key in enumerate(keys):
+        cached = result_cache.get(key)
+        if cached is not None:
+            label_ids[i] = label2id[cached[0]]
+            confidences[i] = cached[1]
+        else:
+            missing.setdefault(key, []).append(i)
+
+    if missing:
+        fresh_ids, fresh_conf = model_fn([texts[rows[0]] for rows in missing.values()], batch_size)
+        for (key, rows), label_id, confidence in zip(missing.items(), fresh_ids.tolist(), fresh_conf.tolist()):
+            result_cache.set(key, (id2label(label_id), confidence))
+            label_ids[rows] = label_id
+            confidences[rows] = confidence
+
+    return label_ids, confidences
+
+def analyze_batch(texts, batch_size=32):
+    return to_tuples(*analyze_batch_arrays(texts, batch_size))
+
+def aggregate_sentiment(label_ids, confidences):
+    """
+    Reduce per-text results to the response aggregates.
+
+    Returns (sentiment_count, sentiment_percentages, risk_level).
+    """
+    load_model()
+    counts = np.bincount(label_ids, minlength=len(model.config.id2label))
+    sentiment_count = {"positive": 0, "neutral": 0, "negative": 0}
+    for label_id, count in enumerate(counts.tolist()):
+        sentiment_count[id2label(label_id).lower()] += count
+
+    total = sum(sentiment_count.values()) or 1
+    sentiment_percentages = {
+        k: round(v / total * 100, 2) for k, v in sentiment_count.items()
+    }
+    negative_ids = [i for i, label in model.config.id2label.items() if label.lower() == "negative"]
+    negative = confidences[np.isin(label_ids, negative_ids)]
+    risk_level = calculate_risk(sentiment_percentages, {"negative": negative})
+    return sentiment_count, sentiment_percentages, risk_level
 
 def calculate_risk(sentiment_percentages, sentiment_confidences=None):
     negative_percent = sentiment_percentages['negative']
     risk_level = negative_percent * 0.8
-    
+
     if sentiment_confidences and 'negative' in sentiment_confidences and len(sentiment_confidences['negative']) > 0:
-        avg_negative_confidence = sum(sentiment_confidences['negative']) / len(sentiment_confidences['negative'])
+        avg_negative_confidence = float(np.mean(sentiment_confidences['negative']))
         risk_level += avg_negative_confidence * 0.2
 
     return round(risk_level, 2)
+
+if __name__ == "__main__":
+    # python -m services.sentiment_analysis  -> parity report for SENTIMENT_BACKEND
+    import json
+    print(json.dumps(check_backend_parity(), indent=2))
@@ -0,0 +1,165 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+
+TRACKING_STORE_PATH = os.getenv("TRACKING_STORE_PATH", "./tracking.sqlite3")
+TRACKING_REFRESH_INTERVAL = float(os.getenv("TRACKING_REFRESH_INTERVAL", "900"))
+# Snapshots older than this are not served in place of a fresh analysis
+TRACKING_MAX_AGE = 2 * TRACKING_REFRESH_INTERVAL
+# Scored items not seen in a refresh for this long are dropped (seconds)
+TRACKING_ITEM_TTL = float(os.getenv("TRACKING_ITEM_TTL", str(7 * 24 * 3600)))
+# How long a parsed snapshot is served before SQLite is asked whether another process replaced it
+TRACKING_SNAPSHOT_RECHECK = float(os.getenv("TRACKING_SNAPSHOT_RECHECK", "5"))
+# Remembered misses are swept of expired entries once there are this many
+_MISS_SWEEP_SIZE = 10000
+
+# Returned by _memoized() when SQLite has to be asked
+_UNCHECKED = object()
+
+
+class TrackedItemStore:
+    """
+    Local SQLite state for tracked queries: every item already scored for a
+    query, keyed by its URL, and the latest analysis snapshot per query.
+    It only holds derived data, so losing the file costs one full re-score.
+
+    Parsed snapshots are memoized; after `recheck` seconds a lookup compares
+    the stored refreshed_at and re-reads the value only if another process
+    wrote a newer one. Queries with no snapshot, which is most of what
+    /api/analyze sees, are remembered for `recheck` seconds too.
+    """
+
+    def __init__(self, path=TRACKING_STORE_PATH, item_ttl=TRACKING_ITEM_TTL, recheck=TRACKING_SNAPSHOT_RECHECK):
+        self.item_ttl = item_ttl
+        self.recheck = recheck
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tracked_items ("
+            " query_key TEXT NOT NULL, item_key TEXT NOT NULL, label_id INTEGER NOT NULL,"
+            " confidence REAL NOT NULL, seen_at REAL NOT NULL, PRIMARY KEY (query_key, item_key))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tracked_snapshots ("
+            " query_key TEXT PRIMARY KEY, value TEXT NOT NULL, refreshed_at REAL NOT NULL)"
+        )
+        # query_key -> (analysis, refreshed_at, checked_at); avoids re-parsing JSON on every hit
+        self._snapshots = {}
+        # query_key -> checked_at for keys with no snapshot
+        self._misses = {}
+
+    def get_items(self, query_key, item_keys):
+        """Return {item_key: (label_id, confidence)} for the keys already scored."""
+        if not item_keys:
+            return {}
+        placeholders = ",".join("?" * len(item_keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT item_key, label_id, confidence FROM tracked_items"
+                f" WHERE query_key = ? AND item_key IN ({placeholders})",
+                (query_key, *item_keys),
+            ).fetchall()
+        return {item_key: (label_id, confidence) for item_key, label_id, confidence in rows}
+
+    def put_items(self, query_key, items, seen_at=None):
+        """`items` is an iterable of (item_key, label_id, confidence); refreshes seen_at for known ones."""
+        seen_at = seen_at or time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tracked_items (query_key, item_key, label_id, confidence, seen_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [(query_key, item_key, int(label_id), float(confidence), seen_at) for item_key, label_id, confidence in items],
+            )
+            self._conn.execute(
+                "DELETE FROM tracked_items WHERE query_key = ? AND seen_at < ?", (query_key, seen_at - self.item_ttl)
+            )
+
+    def set_snapshot(self, query_key, analysis, refreshed_at=None):
+        refreshed_at = time.time() if refreshed_at is None else refreshed_at
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tracked_snapshots (query_key, value, refreshed_at) VALUES (?, ?, ?)",
+                (query_key, json.dumps(analysis), refreshed_at),
+            )
+            self._snapshots[query_key] = (analysis, refreshed_at, time.monotonic())
+            self._misses.pop(query_key, None)
+
+    def _memoized(self, query_key):
+        """
+        (analysis, refreshed_at), or None for no snapshot, if SQLite was
+        checked within `recheck` seconds; _UNCHECKED otherwise.
+        """
+        now = time.monotonic()
+        memo = self._snapshots.get(query_key)
+        if memo is not None and now - memo[2] < self.recheck:
+            return memo[:2]
+        checked_at = self._misses.get(query_key)
+        if checked_at is not None and now - checked_at < self.recheck:
+            return None
+        return _UNCHECKED
+
+    def _remember_miss(self, query_key):
+        now = time.monotonic()
+        if len(self._misses) >= _MISS_SWEEP_SIZE:
+            self._misses = {key: at for key, at in self._misses.items() if now - at < self.recheck}
+        self._misses[query_key] = now
+
+    def _load_snapshot(self, query_key):
+        """Read (analysis, refreshed_at) from SQLite, reusing the memoized value if it is still current."""
+        memo = self._snapshots.get(query_key)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT refreshed_at FROM tracked_snapshots WHERE query_key = ?", (query_key,)
+            ).fetchone()
+            if row is None:
+                self._snapshots.pop(query_key, None)
+                self._remember_miss(query_key)
+                return None
+            refreshed_at = row[0]
+            if memo is not None and memo[1] == refreshed_at:
+                analysis = memo[0]
+            else:
+                value = self._conn.execute(
+                    "SELECT value FROM tracked_snapshots WHERE query_key = ?", (query_key,)
+                ).fetchone()[0]
+                analysis = json.loads(value)
+            self._snapshots[query_key] = (analysis, refreshed_at, time.monotonic())
+        return analysis, refreshed_at
+
+    def get_snapshot(self, query_key, max_age=None):
+        """Return (analysis, refreshed_at), or None if missing or older than `max_age` seconds."""
+        entry = self._memoized(query_key)
+        if entry is _UNCHECKED:
+            entry = self._load_snapshot(query_key)
+        if entry is None or (max_age is not None and time.time() - entry[1] > max_age):
+            return None
+        return entry
+
+    async def fresh_analysis(self, query_key):
+        """The snapshot analysis if it is recent enough to answer a request, else None."""
+        entry = self._memoized(query_key)
+        if entry is _UNCHECKED:
+            # Re-checks read SQLite; keep them off the event loop
+            entry = await asyncio.to_thread(self._load_snapshot, query_key)
+        if entry is None or time.time() - entry[1] > TRACKING_MAX_AGE:
+            return None
+        return entry[0]
+
+    def query_keys(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT query_key FROM tracked_snapshots")]
+
+    def forget(self, query_key):
+        """Drop all state for a query nobody tracks any more."""
+        with self._lock:
+            self._conn.execute("DELETE FROM tracked_items WHERE query_key = ?", (query_key,))
+            self._conn.execute("DELETE FROM tracked_snapshots WHERE query_key = ?", (query_key,))
+            self._snapshots.pop(query_key, None)
+            self._remember_miss(query_key)
+
+
+tracking_store = TrackedItemStore()
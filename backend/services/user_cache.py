@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import logging
+import math
+import os
+from datetime import datetime, timedelta
+
+from services.db import execute, supabase
+from services.query_cache import MemoryBackend, QueryCache
+
+logger = logging.getLogger("sentilyst")
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+# Bounds how long another instance's profile update can go unseen here
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+
+EMAIL_FILTER_ENABLED = os.getenv("EMAIL_FILTER_ENABLED", "1") == "1"
+# New users are pulled in this often (seconds); the filter is rebuilt from scratch every EMAIL_FILTER_REBUILD_INTERVAL
+EMAIL_FILTER_REFRESH_INTERVAL = float(os.getenv("EMAIL_FILTER_REFRESH_INTERVAL", "30"))
+EMAIL_FILTER_REBUILD_INTERVAL = float(os.getenv("EMAIL_FILTER_REBUILD_INTERVAL", "3600"))
+EMAIL_FILTER_FP_RATE = float(os.getenv("EMAIL_FILTER_FP_RATE", "0.01"))
+EMAIL_FILTER_PAGE_SIZE = 1000
+
+# user id -> {"full_name", "email", "profile_url"}; writes go through put()
+profile_cache = QueryCache(MemoryBackend(maxsize=USER_CACHE_SIZE), ttl=USER_CACHE_TTL, stale_ttl=0)
+
+
+def _ist_now():
+    return datetime.utcnow() + timedelta(hours=5, minutes=30)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing of one blake2b digest."""
+
+    def __init__(self, capacity, fp_rate=EMAIL_FILTER_FP_RATE):
+        capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class EmailFilter:
+    """
+    Negative cache for "is this email registered?".
+
+    A miss in the Bloom filter means no user had that email as of the last
+    sync, so callers can skip the users table; a hit may be a false
+    positive and must be confirmed there. Until the first build finishes,
+    every email counts as a possible hit. Users registered by this process
+    are added immediately, those from other instances on the next sync.
+    """
+
+    def __init__(
+        self,
+        refresh_interval=EMAIL_FILTER_REFRESH_INTERVAL,
+        rebuild_interval=EMAIL_FILTER_REBUILD_INTERVAL,
+        fp_rate=EMAIL_FILTER_FP_RATE,
+    ):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.fp_rate = fp_rate
+        self._filter = None
+        self._synced_at = None
+        self._built_at = 0.0
+        # Emails added while a rebuild is reading the table, replayed into the new filter
+        self._added_during_rebuild = None
+        self._worker = None
+
+    def might_exist(self, email):
+        return self._filter is None or email in self._filter
+
+    def add(self, email):
+        if self._filter is not None:
+            self._filter.add(email)
+        if self._added_during_rebuild is not None:
+            self._added_during_rebuild.append(email)
+
+    def start(self):
+        if self._worker is None:
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                needs_rebuild = (
+                    self._filter is None
+                    or loop.time() - self._built_at >= self.rebuild_interval
+                    # Keep the false positive rate near target as the user base grows
+                    or self._filter.count > self._filter.capacity
+                )
+                if needs_rebuild:
+                    await self.rebuild()
+                else:
+                    await self.sync()
+            except Exception as e:
+                logger.warning(f"Email filter refresh failed: {e!r}")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def _emails(self, created_since=None):
+        """All user emails (keyset-paged), or only those created since a timestamp."""
+        emails = []
+        last = None
+        while True:
+            builder = supabase.table("users").select("email")
+            if created_since is not None:
+                builder = builder.gte("created_at", created_since)
+            if last is not None:
+                builder = builder.gt("email", last)
+            response = await execute(builder.order("email").limit(EMAIL_FILTER_PAGE_SIZE), "users.select_emails")
+            rows = response.data or []
+            emails += [row["email"] for row in rows if row.get("email")]
+            if len(rows) < EMAIL_FILTER_PAGE_SIZE:
+                return emails
+            last = rows[-1]["email"]
+
+    async def rebuild(self):
+        started = _ist_now()
+        self._added_during_rebuild = []
+        try:
+            emails = await self._emails()
+            # Hashing every email takes a while on a large table; keep it off the event loop
+            bloom = await asyncio.to_thread(self._build, emails)
+        finally:
+            added, self._added_during_rebuild = self._added_during_rebuild, None
+        for email in added:
+            bloom.add(email)
+        self._filter = bloom
+        self._synced_at = started
+        self._built_at = asyncio.get_running_loop().time()
+        logger.info(f"Email filter rebuilt with {len(emails) + len(added)} emails")
+
+    def _build(self, emails):
+        bloom = BloomFilter(max(1000, 2 * len(emails)), self.fp_rate)
+        for email in emails:
+            bloom.add(email)
+        return bloom
+
+    async def sync(self):
+        """Add users created since the last sync (with a margin for clock skew and slow inserts)."""
+        started = _ist_now()
+        since = self._synced_at - timedelta(seconds=self.refresh_interval)
+        for email in await self._emails(since.isoformat()):
+            # The margin re-reads recent users; don't count them twice
+            if email not in self._filter:
+                self._filter.add(email)
+        self._synced_at = started
+
+
+email_filter = EmailFilter()
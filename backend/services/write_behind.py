@@ -0,0 +1,182 @@
+import asyncio
+import json
+import logging
+import os
+
+from services.db import execute, supabase
+
+logger = logging.getLogger("sentilyst")
+
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "1") == "1"
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "50"))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "1.0"))
+WRITE_BEHIND_MAX_RETRIES = int(os.getenv("WRITE_BEHIND_MAX_RETRIES", "5"))
+# Optional JSONL file holding not-yet-flushed rows so they survive a crash
+WRITE_BEHIND_SPOOL_PATH = os.getenv("WRITE_BEHIND_SPOOL_PATH", "")
+
+
+class WriteBehindQueue:
+    """
+    Buffers rows for a table and writes them in bulk inserts.
+
+    A flush happens when `batch_size` rows are pending or `flush_interval`
+    seconds have passed. Failed inserts are retried with exponential backoff
+    and then kept for the next flush. With a spool file, pending rows are
+    appended to disk before enqueue returns and replayed on start, so
+    delivery is at-least-once across crashes. Spool writes run in a worker
+    thread, and appends from concurrent enqueues are batched into one. `on_flushed`, if set, is called with each
+    batch once its insert has succeeded.
+    """
+
+    def __init__(
+        self,
+        table,
+        batch_size=WRITE_BEHIND_BATCH_SIZE,
+        flush_interval=WRITE_BEHIND_FLUSH_INTERVAL,
+        max_retries=WRITE_BEHIND_MAX_RETRIES,
+        spool_path=WRITE_BEHIND_SPOOL_PATH,
+    ):
+        self.table = table
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.spool_path = spool_path
+        self._pending = []
+        self._wakeup = None
+        self._worker = None
+        self._flush_lock = None
+        self.on_flushed = None
+        # Rows enqueued but not yet appended to the spool; spool writes are serialized by the lock
+        self._unspooled = []
+        self._spool_lock = asyncio.Lock()
+
+    def start(self):
+        if self._worker is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        if self.spool_path:
+            # The spool already holds every row enqueued so far, including any from before start()
+            self._pending = self._load_spool()
+        if self._pending:
+            logger.info(f"Replaying {len(self._pending)} spooled {self.table} rows")
+            self._wakeup.set()
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and drain everything still pending, including a cancelled in-flight batch."""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        while self._pending:
+            if not await self.flush():
+                logger.error(f"Shutting down with {len(self._pending)} unsaved {self.table} rows")
+                break
+
+    async def enqueue(self, row):
+        await self.enqueue_many([row])
+
+    async def enqueue_many(self, rows):
+        self._pending.extend(rows)
+        if self.spool_path:
+            self._unspooled.extend(rows)
+            async with self._spool_lock:
+                # Rows queued meanwhile go in the same append; a rewrite may already have covered ours
+                batch, self._unspooled = self._unspooled, []
+                if batch:
+                    await asyncio.to_thread(self._append_spool, batch)
+        if self._wakeup is not None and len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._pending:
+                if not await self.flush():
+                    break
+
+    async def flush(self):
+        """Insert up to one batch; returns False if it had to be put back."""
+        async with self._flush_lock:
+            batch = self._pending[:self.batch_size]
+            if not batch:
+                return True
+            del self._pending[:len(batch)]
+
+            delay = 0.5
+            try:
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        await execute(supabase.table(self.table).insert(batch), f"{self.table}.bulk_insert")
+                    except Exception as e:
+                        if attempt == self.max_retries:
+                            logger.error(f"Bulk insert of {len(batch)} {self.table} rows failed, will retry later: {e!r}")
+                            break
+                        await asyncio.sleep(delay)
+                        delay *= 2
+                        continue
+                    # Only now is the batch safe to drop from the spool
+                    await self._rewrite_spool()
+                    self._notify_flushed(batch)
+                    return True
+            except BaseException:
+                # Cancelled mid-insert (e.g. by stop()): keep the batch for the final drain.
+                # The insert may still have landed, which at-least-once delivery allows.
+                self._pending[:0] = batch
+                raise
+
+            self._pending[:0] = batch
+            return False
+
+    def _notify_flushed(self, batch):
+        if self.on_flushed is None:
+            return
+        try:
+            self.on_flushed(batch)
+        except Exception as e:
+            # The rows are saved; a failing listener must not get them inserted again
+            logger.error(f"on_flushed failed for {len(batch)} {self.table} rows: {e!r}")
+
+    def _load_spool(self):
+        if not self.spool_path or not os.path.exists(self.spool_path):
+            return []
+        rows = []
+        with open(self.spool_path) as spool:
+            for line in spool:
+                line = line.strip()
+                if line:
+                    try:
+                        rows.append(json.loads(line))
+                    except ValueError:
+                        logger.warning(f"Skipping corrupt line in {self.spool_path}")
+        return rows
+
+    def _append_spool(self, rows):
+        with open(self.spool_path, "a") as spool:
+            spool.write("".join(json.dumps(row) + "\n" for row in rows))
+
+    async def _rewrite_spool(self):
+        if not self.spool_path:
+            return
+        async with self._spool_lock:
+            # Every pending row, including any still waiting to be appended
+            self._unspooled = []
+            await asyncio.to_thread(self._write_spool, list(self._pending))
+
+    def _write_spool(self, rows):
+        tmp_path = f"{self.spool_path}.tmp"
+        with open(tmp_path, "w") as spool:
+            spool.write("".join(json.dumps(row) + "\n" for row in rows))
+        os.replace(tmp_path, self.spool_path)
+
+
+analyzed_data_writer = WriteBehindQueue("analyzed_data")
@@ -0,0 +1,93 @@
+"""
+Tests run offline: settings come from benchmarks.offline (dummy Supabase
+key, no HF Hub, no eager model load) and every test that touches the
+database swaps `execute` for an in-memory fake.
+"""
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND not in sys.path:
+    sys.path.insert(0, BACKEND)
+
+from benchmarks import offline  # noqa: E402
+
+offline.configure()
+os.environ.setdefault("EMAIL_FILTER_ENABLED", "0")
+os.environ.setdefault("ROLLUPS_ENABLED", "0")
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class FakeExecute:
+    """Stands in for services.db.execute: records (name, params) and answers from `responses`."""
+
+    def __init__(self, responses=None):
+        self.responses = responses or {}
+        self.calls = []
+
+    async def __call__(self, query, name="query", timeout=None):
+        self.calls.append((name, getattr(query, "params", None)))
+        response = self.responses.get(name, [])
+        data = response(query) if callable(response) else response
+        return SimpleNamespace(data=data, count=None)
+
+    def names(self):
+        return [name for name, _ in self.calls]
+
+
+@pytest.fixture
+def fake_execute():
+    return FakeExecute()
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    """A loaded-looking SST-2 style model so label helpers work without weights."""
+    from services import sentiment_analysis
+
+    config = SimpleNamespace(id2label={0: "NEGATIVE", 1: "POSITIVE"}, label2id={"NEGATIVE": 0, "POSITIVE": 1})
+    monkeypatch.setattr(sentiment_analysis, "model", SimpleNamespace(config=config), raising=False)
+    monkeypatch.setattr(sentiment_analysis, "backend", SimpleNamespace(name="fake"), raising=False)
+    return sentiment_analysis
+
+
+@pytest.fixture
+def fixture_http():
+    """Serve the benchmark fixtures from the shared HTTP client for one test."""
+    from services import http_client
+
+    offline.install_fixtures(latency_ms=100)
+    yield
+    http_client._client = None
+
+
+class FakeBatcher:
+    """Scores every text POSITIVE (label 1) unless it mentions a loss; records what it was sent."""
+
+    def __init__(self):
+        self.submitted = []
+
+    async def submit(self, texts):
+        import numpy as np
+
+        texts = list(texts)
+        self.submitted.append(texts)
+        label_ids = np.array([0 if "loss" in text.lower() else 1 for text in texts], dtype=np.int64)
+        return label_ids, np.full(len(texts), 0.9)
+
+
+@pytest.fixture
+def stub_pipeline(monkeypatch, fake_model, fixture_http):
+    """Controllers scrape the fixtures and score through a FakeBatcher."""
+    from controllers import sentiment_controller
+
+    fake = FakeBatcher()
+    monkeypatch.setattr(sentiment_controller, "batcher", fake)
+    return fake
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from conftest import run
+from services import auth, http_client
+
+
+def test_bcrypt_runs_in_its_pool_while_the_loop_keeps_ticking(monkeypatch):
+    threads = []
+    real_hash = auth.pwd_context.hash
+
+    def traced_hash(password):
+        threads.append(threading.current_thread().name)
+        return real_hash(password)
+
+    monkeypatch.setattr(auth.pwd_context, "hash", traced_hash)
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.001)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        hashed = await auth.hash_password("hunter2")
+        task.cancel()
+        return hashed, ticks
+
+    hashed, ticks = run(main())
+    assert threads[0].startswith("bcrypt")
+    assert ticks > 0
+    assert run(auth.verify_password("hunter2", hashed))
+    assert not run(auth.verify_password("wrong", hashed))
+
+
+@pytest.fixture
+def tokeninfo(monkeypatch):
+    calls = []
+
+    def handler(request):
+        token = request.url.params["id_token"]
+        calls.append(token)
+        if token == "bad":
+            return httpx.Response(400)
+        exp = time.time() + (600 if token != "expired" else -1)
+        return httpx.Response(200, json={"email": f"{token}@example.com", "exp": str(int(exp))})
+
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(auth, "_google_tokens", type(auth._google_tokens)())
+    yield calls
+    monkeypatch.setattr(http_client, "_client", None)
+
+
+def test_google_tokens_are_cached_until_exp(tokeninfo):
+    assert run(auth.verify_google_token("alice"))["email"] == "alice@example.com"
+    assert run(auth.verify_google_token("alice"))["email"] == "alice@example.com"
+    run(auth.verify_google_token("expired"))
+    run(auth.verify_google_token("expired"))
+    with pytest.raises(auth.InvalidGoogleToken):
+        run(auth.verify_google_token("bad"))
+    assert tokeninfo == ["alice", "expired", "expired", "bad"]
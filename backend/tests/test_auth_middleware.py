@@ -0,0 +1,67 @@
+import time
+
+import pytest
+from jose import jwt
+
+from conftest import run
+from middleware import auth_middleware as am
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    cache = am.TokenCache(maxsize=2, ttl=60)
+    monkeypatch.setattr(am, "token_cache", cache)
+    return cache
+
+
+def make_token(sub="user-1", **claims):
+    return jwt.encode({"sub": sub, **claims}, am.JWT_SECRET, algorithm=am.JWT_ALGORITHM)
+
+
+def test_token_cache_is_lru_and_honours_exp():
+    cache = am.TokenCache(maxsize=2, ttl=60)
+    cache.set("a", "u1", None, now=0)
+    cache.set("b", "u2", exp=10, now=0)
+    cache.get("a", now=1)
+    cache.set("c", "u3", None, now=1)
+
+    assert cache.get("b", now=2) is None
+    assert cache.get("a", now=2) == ("u1", 60)
+    assert cache.get("c", now=60.5) == ("u3", 61) and cache.get("c", now=61) is None
+    cache.set("expired", "u4", exp=5, now=10)
+    assert cache.get("expired", now=10) is None
+
+
+def test_authenticate_verifies_once_then_hits_cache(monkeypatch, fresh_cache):
+    token = make_token(exp=int(time.time()) + 600)
+    decodes = []
+    real_decode = am.jwt.decode
+    monkeypatch.setattr(am.jwt, "decode", lambda *args, **kwargs: decodes.append(1) or real_decode(*args, **kwargs))
+
+    assert am.authenticate(token) == "user-1"
+    assert am.authenticate(token) == "user-1"
+    assert len(decodes) == 1
+    assert am.authenticate("not-a-jwt") is None
+    assert am.authenticate(make_token(exp=int(time.time()) - 1)) is None
+
+
+def call(path, token=None):
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen.update(scope)
+
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    run(am.AuthMiddleware(app)({"type": "http", "path": path, "headers": headers}, None, None))
+    return seen["state"]["user"]
+
+
+def test_middleware_sets_user_and_skips_public_routes(monkeypatch, fresh_cache):
+    token = make_token()
+    assert call("/api/getdata", token) == "user-1"
+    assert call("/api/getdata") is None
+    assert call("/api/getdata", "garbage") is None
+
+    monkeypatch.setattr(am, "authenticate", lambda token: pytest.fail("public route decoded a token"))
+    assert call("/api/news/ma", token) is None
+    assert call("/health", token) is None
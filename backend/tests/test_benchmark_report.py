@@ -0,0 +1,37 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks import report
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+
+def test_compare_uses_each_metric_direction():
+    baseline = {"metrics": {"analyze_per_s": 100, "analyze_p95_ms": 200, "failures": 0, "old_ms": 1}}
+    current = {"metrics": {"analyze_per_s": 80, "analyze_p95_ms": 150, "failures": 0, "new_ms": 1}}
+
+    rows, regressions = report.compare(baseline, current, threshold=0.10)
+    status = {row[0]: row[4] for row in rows}
+    assert status == {
+        "analyze_per_s": "REGRESSED",
+        "analyze_p95_ms": "improved",
+        "failures": "ok",
+        "new_ms": "added",
+        "old_ms": "removed",
+    }
+    assert regressions == ["analyze_per_s"]
+    assert report.compare(baseline, current, threshold=0.25)[1] == []
+
+
+def test_cli_exits_nonzero_on_regression(tmp_path):
+    report.save({"analyze_p95_ms": 100.0}, tmp_path / "base.json")
+    report.save({"analyze_p95_ms": 130.0}, tmp_path / "new.json")
+    assert json.loads((tmp_path / "base.json").read_text())["environment"]["python"]
+
+    args = [sys.executable, "-m", "benchmarks.report", str(tmp_path / "base.json"), str(tmp_path / "new.json")]
+    failed = subprocess.run(args, cwd=BACKEND, capture_output=True, text=True)
+    assert failed.returncode == 1 and "REGRESSED" in failed.stdout
+    passed = subprocess.run([*args, "--threshold", "0.5"], cwd=BACKEND, capture_output=True, text=True)
+    assert passed.returncode == 0
@@ -0,0 +1,28 @@
+from services.categorizer import categorize_article, categorize_articles, is_ma_article
+
+
+def test_first_matching_category_wins():
+    assert categorize_article("Bank buys cloud software maker", None) == "technology"
+    assert categorize_article("Regional bank merger", "") == "finance"
+    assert categorize_article("GROCERY store takeover", None) == "retail"
+    assert categorize_article("Mining merger", "copper") == "other"
+
+
+def test_ma_filter_matches_keyword_suffixes():
+    assert is_ma_article("Rival acquires startup", None)
+    assert is_ma_article(None, "Founder BUYS OUT partner")
+    assert not is_ma_article("Quarterly earnings beat estimates", "")
+
+
+def test_batch_matches_single_article_path():
+    articles = [
+        {"title": "Fintech acquisition closes", "description": "payments"},
+        {"title": "Weather update", "description": None},
+        {"title": None, "description": "Shop owner agrees deal for fashion brand"},
+        {},
+    ]
+    expected = [
+        categorize_article(a.get("title"), a.get("description")) if is_ma_article(a.get("title"), a.get("description")) else None
+        for a in articles
+    ]
+    assert categorize_articles(articles) == expected == ["technology", None, "retail", None]
@@ -0,0 +1,48 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from conftest import run
+from services import db
+
+
+class BlockingQuery:
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.thread = None
+
+    def execute(self):
+        self.thread = threading.current_thread()
+        time.sleep(self.seconds)
+        return SimpleNamespace(data=[{"ok": True}])
+
+
+def test_execute_runs_the_blocking_call_off_the_event_loop():
+    query = BlockingQuery(0.1)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def main():
+        result, _ = await asyncio.gather(db.execute(query, "test.blocking"), ticker())
+        return result
+
+    assert run(main()).data == [{"ok": True}]
+    assert query.thread is not threading.main_thread()
+    # The loop kept ticking while the query slept
+    assert len(ticks) == 5 and ticks[-1] - ticks[0] < 0.09
+
+
+def test_execute_timeout_is_a_504_and_is_counted():
+    before = db.db_stats.snapshot().get("test.timeout", {}).get("errors", 0)
+    with pytest.raises(HTTPException) as error:
+        run(db.execute(BlockingQuery(0.3), "test.timeout", timeout=0.05))
+    assert error.value.status_code == 504
+    assert db.db_stats.snapshot()["test.timeout"]["errors"] == before + 1
@@ -0,0 +1,33 @@
+import pytest
+
+from services import dedup
+
+TEXTS = [
+    "Acme Corp agrees to buy Widget Inc for $2 billion in cash deal",
+    "ACME corp agrees to buy Widget Inc. for $2 billion in cash deal!",
+    "Acme Corp agrees to buy Widget Inc for $2 billion in cash deal, sources say",
+    "Widget Inc shares fall after weak quarterly guidance",
+    "Acme Corp agrees to buy Widget Inc for $3 billion in stock",
+]
+
+
+def test_near_duplicates_point_at_their_first_occurrence():
+    assert dedup.find_representatives(TEXTS, threshold=0.8) == [0, 0, 0, 3, 4]
+    # A stricter threshold keeps the reworded copy apart; exact copies still collapse
+    assert dedup.find_representatives(TEXTS, threshold=0.95) == [0, 0, 2, 3, 4]
+
+
+def test_collapse_modes():
+    unique, index, counted = dedup.collapse(TEXTS, mode="count")
+    assert unique == [TEXTS[0], TEXTS[3], TEXTS[4]]
+    assert index.tolist() == [0, 0, 0, 1, 2] and counted.all()
+
+    _, index, counted = dedup.collapse(TEXTS, mode="exclude")
+    assert counted.tolist() == [True, False, False, True, True]
+
+    unique, index, counted = dedup.collapse(TEXTS, mode="off")
+    assert unique == TEXTS and index.tolist() == list(range(5)) and counted.all()
+
+    assert dedup.collapse([], mode="count")[0] == []
+    with pytest.raises(ValueError):
+        dedup.collapse(TEXTS, mode="sometimes")
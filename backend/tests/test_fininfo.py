@@ -0,0 +1,62 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from conftest import run
+from controllers import fininfo
+from services import http_client
+from services.query_cache import MemoryBackend, QueryCache
+
+
+@pytest.fixture
+def rapidapi(monkeypatch):
+    """Fake calendar API: counts calls per ticker and the peak number in flight."""
+    state = {"calls": [], "active": 0, "peak": 0}
+
+    async def handler(request):
+        ticker = request.url.params["tickersFilter"]
+        state["calls"].append(ticker)
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.02)
+        state["active"] -= 1
+        if ticker == "BAD":
+            return httpx.Response(500)
+        day = {"timestamp": 1700000000000, "records": [{"companyName": ticker, "type": "Earnings"}]}
+        return httpx.Response(200, json={"finance": {"result": {"mixedEvents": [day]}}})
+
+    monkeypatch.setattr(fininfo, "RAPIDAPI_KEY", "test-key")
+    monkeypatch.setattr(fininfo, "RAPIDAPI_HOST", "calendar.test")
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(fininfo, "calendar_cache", QueryCache(MemoryBackend(maxsize=100), ttl=60, stale_ttl=60))
+    monkeypatch.setattr(fininfo, "_upstream_slots", asyncio.Semaphore(2))
+    yield state
+    monkeypatch.setattr(fininfo, "RAPIDAPI_KEY", "test-key")
+    monkeypatch.setattr(fininfo, "RAPIDAPI_HOST", "calendar.test")
+    monkeypatch.setattr(http_client, "_client", None)
+
+
+def test_parse_tickers_normalizes_and_bounds(monkeypatch):
+    assert fininfo.parse_tickers(" aapl,MSFT,,aapl , tsla") == ["AAPL", "MSFT", "TSLA"]
+    with pytest.raises(HTTPException):
+        fininfo.parse_tickers(" , ")
+    monkeypatch.setattr(fininfo, "CALENDAR_MAX_TICKERS", 2)
+    with pytest.raises(HTTPException):
+        fininfo.parse_tickers("A,B,C")
+
+
+def test_many_tickers_run_bounded_and_cached(rapidapi):
+    tickers = ["AAPL", "MSFT", "TSLA", "BAD"]
+
+    first = run(fininfo.fetch_ma_events_many(tickers))
+    assert set(first["results"]) == {"AAPL", "MSFT", "TSLA"}
+    assert list(first["errors"]) == ["BAD"]
+    assert first["results"]["MSFT"]["eventsData"][0]["title"] == "MSFT Earnings"
+    assert rapidapi["peak"] == 2
+
+    second = run(fininfo.fetch_ma_events_many(tickers))
+    assert second["results"] == first["results"]
+    # Only the failed ticker goes upstream again
+    assert sorted(rapidapi["calls"]) == ["AAPL", "BAD", "BAD", "MSFT", "TSLA"]
@@ -0,0 +1,38 @@
+import json
+import os
+import subprocess
+import sys
+
+import main
+from services import sentiment_analysis
+
+
+def test_importing_the_app_does_not_load_the_model():
+    code = "import main, sys; from services import sentiment_analysis as s; print(s.model_status(), 'transformers' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env={**os.environ, "SENTIMENT_EAGER_LOAD": "0"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.split()[-2:] == ["cold", "False"]
+
+
+def test_ready_reports_503_until_eager_warm_start_finishes(monkeypatch):
+    assert main.health() == {"status": "ok"}
+
+    monkeypatch.setattr(main, "SENTIMENT_EAGER_LOAD", True)
+    monkeypatch.setattr(sentiment_analysis, "_status", "loading")
+    response = main.ready()
+    assert response.status_code == 503 and json.loads(response.body)["model"] == "loading"
+
+    monkeypatch.setattr(sentiment_analysis, "_status", "ready")
+    assert main.ready().status_code == 200
+
+
+def test_lazy_mode_is_always_ready(monkeypatch):
+    monkeypatch.setattr(main, "SENTIMENT_EAGER_LOAD", False)
+    monkeypatch.setattr(sentiment_analysis, "_status", "cold")
+    assert main.ready().status_code == 200
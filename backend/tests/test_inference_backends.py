@@ -0,0 +1,78 @@
+import importlib.util
+from types import SimpleNamespace
+
+import pytest
+import torch
+
+from services import sentiment_analysis
+from services.sentiment_analysis import QuantizedTorchBackend, TorchBackend, create_backend
+
+
+class TinyClassifier(torch.nn.Module):
+    """Stands in for the sequence classifier: mean of embeddings -> Linear -> logits."""
+
+    def __init__(self):
+        super().__init__()
+        torch.manual_seed(0)
+        self.embed = torch.nn.Embedding(100, 16)
+        self.head = torch.nn.Linear(16, 2)
+
+    def forward(self, input_ids, attention_mask):
+        hidden = (self.embed(input_ids) * attention_mask.unsqueeze(-1)).mean(dim=1)
+        return SimpleNamespace(logits=self.head(hidden))
+
+
+def inputs():
+    input_ids = torch.randint(0, 100, (8, 12), generator=torch.Generator().manual_seed(1))
+    return {"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids)}
+
+
+def test_backends_are_selected_by_name():
+    assert isinstance(create_backend("torch", TinyClassifier()), TorchBackend)
+    assert isinstance(create_backend("torch-int8", TinyClassifier()), QuantizedTorchBackend)
+    with pytest.raises(ValueError):
+        create_backend("tensorrt", TinyClassifier())
+
+
+def test_int8_backend_agrees_with_eager_model():
+    batch = inputs()
+    expected = TorchBackend(TinyClassifier()).logits(batch)
+    actual = QuantizedTorchBackend(TinyClassifier()).logits(batch)
+    assert torch.equal(expected.argmax(dim=-1), actual.argmax(dim=-1))
+    assert torch.allclose(expected, actual, atol=0.05)
+
+
+@pytest.mark.skipif(importlib.util.find_spec("onnxruntime") is not None, reason="onnxruntime is installed")
+def test_onnx_backend_without_onnxruntime_fails_clearly():
+    with pytest.raises(RuntimeError, match="onnxruntime"):
+        sentiment_analysis.OnnxBackend(TinyClassifier())
+
+
+def tiny_distilbert():
+    from transformers import DistilBertConfig, DistilBertForSequenceClassification
+
+    torch.manual_seed(0)
+    config = DistilBertConfig(
+        vocab_size=100, dim=32, hidden_dim=64, n_layers=2, n_heads=2, max_position_embeddings=64, num_labels=2
+    )
+    return DistilBertForSequenceClassification(config).eval()
+
+
+@pytest.mark.skipif(importlib.util.find_spec("onnxruntime") is None, reason="onnxruntime is not installed")
+def test_onnx_export_agrees_with_eager_model(monkeypatch, tmp_path):
+    def warmup_tokenizer(texts, return_tensors):
+        return {"input_ids": torch.tensor([[1, 7, 2]]), "attention_mask": torch.ones(1, 3, dtype=torch.long)}
+
+    # Export traces with one short sequence; batch size and length must stay dynamic
+    monkeypatch.setattr(sentiment_analysis, "tokenizer", warmup_tokenizer)
+    model = tiny_distilbert()
+    path = tmp_path / "model.onnx"
+    onnx = sentiment_analysis.OnnxBackend(model, path=str(path))
+    assert path.exists()
+
+    batch = inputs()
+    batch["attention_mask"][:, 9:] = 0
+    expected = TorchBackend(model).logits(batch)
+    actual = onnx.logits(batch)
+    assert torch.equal(expected.argmax(dim=-1), actual.argmax(dim=-1))
+    assert torch.allclose(expected, actual, atol=1e-4)
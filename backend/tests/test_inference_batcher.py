@@ -0,0 +1,75 @@
+import asyncio
+import threading
+
+import numpy as np
+
+from conftest import run
+from services.inference_batcher import InferenceBatcher
+
+
+def fake_infer(texts):
+    return np.array([len(t) for t in texts], dtype=np.int64), np.ones(len(texts))
+
+
+def test_concurrent_submits_share_one_batch():
+    batches = []
+
+    def infer(texts):
+        batches.append(list(texts))
+        return fake_infer(texts)
+
+    async def main():
+        batcher = InferenceBatcher(infer, max_batch_size=64, max_wait_ms=50)
+        results = await asyncio.gather(*(batcher.submit(["x" * i, "y"]) for i in range(1, 6)))
+        await batcher.stop()
+        return results
+
+    results = run(main())
+    assert len(batches) == 1 and len(batches[0]) == 10
+    for i, (label_ids, _) in enumerate(results, start=1):
+        assert label_ids.tolist() == [i, 1]
+
+
+def test_stop_fails_job_held_while_collecting_a_batch():
+    async def main():
+        batcher = InferenceBatcher(fake_infer, max_batch_size=10, max_wait_ms=5000)
+        waiting = asyncio.ensure_future(batcher.submit(["a"]))
+        # The worker has taken the job off the queue and waits for more
+        await asyncio.sleep(0.05)
+        await batcher.stop()
+        return await asyncio.wait_for(asyncio.gather(waiting, return_exceptions=True), 1)
+
+    (result,) = run(main())
+    assert isinstance(result, RuntimeError)
+
+
+def test_stop_waits_for_running_batch_and_fails_queued_jobs():
+    release = threading.Event()
+
+    def slow_infer(texts):
+        release.wait(5)
+        return fake_infer(texts)
+
+    async def main():
+        batcher = InferenceBatcher(slow_infer, max_batch_size=2, max_wait_ms=0)
+        running = asyncio.ensure_future(batcher.submit(["a", "b"]))
+        await asyncio.sleep(0.05)
+        queued = asyncio.ensure_future(batcher.submit(["c"]))
+        await asyncio.sleep(0.05)
+        stopping = asyncio.ensure_future(batcher.stop())
+        await asyncio.sleep(0.05)
+        release.set()
+        await asyncio.wait_for(stopping, 2)
+        return await asyncio.wait_for(asyncio.gather(running, queued, return_exceptions=True), 1)
+
+    running, queued = run(main())
+    assert running[0].tolist() == [1, 1]
+    assert isinstance(queued, RuntimeError)
+
+
+def test_empty_submit_skips_the_model():
+    def infer(texts):
+        raise AssertionError("model called for no texts")
+
+    label_ids, confidences = run(InferenceBatcher(infer).submit([]))
+    assert len(label_ids) == 0 and len(confidences) == 0
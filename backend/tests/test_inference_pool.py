@@ -0,0 +1,41 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from services import sentiment_analysis
+from services.inference_pool import InferencePool
+
+loads = []
+
+
+def fake_run_model(texts, batch_size=32):
+    # Label each text with the pid of the process that scored it
+    return np.full(len(texts), os.getpid(), dtype=np.int64), np.ones(len(texts))
+
+
+@pytest.fixture
+def stub_model(monkeypatch):
+    loads.clear()
+    monkeypatch.setattr(sentiment_analysis, "load_model", lambda: loads.append(threading.current_thread()))
+    monkeypatch.setattr(sentiment_analysis, "run_model", fake_run_model)
+
+
+def test_run_model_before_start_refuses_to_fork(stub_model):
+    pool = InferencePool(workers=2, threads_per_worker=1)
+    with pytest.raises(RuntimeError, match="not started"):
+        pool.run_model(["a"])
+    assert pool._executor is None and not loads
+
+
+def test_workers_score_texts_in_child_processes(stub_model):
+    pool = InferencePool(workers=2, threads_per_worker=1)
+    pool.start()
+    try:
+        label_ids, _ = pool.run_model(["a", "b", "c"])
+    finally:
+        pool.shutdown()
+    # The model was loaded once, in the parent, before the fork
+    assert loads == [threading.main_thread()]
+    assert len(set(label_ids.tolist())) == 1 and label_ids[0] != os.getpid()
@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+from conftest import run
+from middleware import metrics_middleware
+from services import metrics
+
+
+def test_histogram_renders_cumulative_buckets_and_escaped_labels(monkeypatch):
+    monkeypatch.setattr(metrics, "_registry", [])
+    histogram = metrics.Histogram("t_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value, '/a"b')
+    counter = metrics.Counter("t_total", "Test.", ("upstream",))
+    counter.inc("x", amount=2)
+
+    lines = metrics.render().splitlines()
+    assert 't_seconds_bucket{route="/a\\"b",le="0.1"} 2' in lines
+    assert 't_seconds_bucket{route="/a\\"b",le="1.0"} 3' in lines
+    assert 't_seconds_bucket{route="/a\\"b",le="+Inf"} 4' in lines
+    assert 't_seconds_count{route="/a\\"b"} 4' in lines
+    assert 't_total{upstream="x"} 2' in lines
+
+
+def test_middleware_reports_stages_in_server_timing(monkeypatch):
+    monkeypatch.setattr(metrics_middleware, "SERVER_TIMING", True)
+    observed = []
+    monkeypatch.setattr(metrics_middleware.request_seconds, "observe", lambda *args: observed.append(args))
+
+    async def app(scope, receive, send):
+        with metrics.stage("test", "scrape"):
+            pass
+        scope["route"] = SimpleNamespace(path="/api/items/{id}")
+        await send({"type": "http.response.start", "status": 201, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/api/items/7"}
+    run(metrics_middleware.MetricsMiddleware(app)(scope, None, send))
+
+    header = dict(sent[0]["headers"])[b"server-timing"].decode()
+    assert header.startswith("scrape;dur=") and ", total;dur=" in header
+    assert observed[0][1:] == ("POST", "/api/items/{id}", "201")
+    # Timings are scoped to the request
+    assert metrics._request_timings.get() is None
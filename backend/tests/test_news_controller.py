@@ -0,0 +1,74 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from conftest import run
+from controllers import news_controller as nc
+
+
+@pytest.fixture
+def failing_newsapi(monkeypatch):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise HTTPException(status_code=502, detail="NewsAPI down")
+
+    monkeypatch.setattr(nc, "_fetch_categorized_news", fetch)
+    monkeypatch.setattr(nc, "_snapshot", None)
+    monkeypatch.setattr(nc, "_inflight", None)
+    monkeypatch.setattr(nc, "_last_attempt", None)
+    return calls
+
+
+def test_failed_refresh_is_shared_and_keeps_snapshot(monkeypatch, failing_newsapi):
+    stale = {"body": b"{}", "gzip": b"", "etag": '"old"', "fetched_at": 0.0}
+    monkeypatch.setattr(nc, "_snapshot", stale)
+
+    async def main():
+        return await asyncio.gather(*(nc.refresh_news() for _ in range(5)))
+
+    assert run(main()) == [stale] * 5
+    assert len(failing_newsapi) == 1
+
+
+def test_failed_first_refresh_raises_for_every_waiter_once(failing_newsapi):
+    async def main():
+        return await asyncio.gather(*(nc.refresh_news() for _ in range(5)), return_exceptions=True)
+
+    results = run(main())
+    assert all(isinstance(result, HTTPException) and result.status_code == 502 for result in results)
+    assert len(failing_newsapi) == 1
+    # The next call after a finished refresh goes upstream again
+    with pytest.raises(HTTPException):
+        run(nc.refresh_news())
+    assert len(failing_newsapi) == 2
+
+
+def test_stale_feed_is_served_while_one_refresh_runs_behind_it(monkeypatch, failing_newsapi):
+    stale = {"body": b"{}", "gzip": b"", "etag": '"old"', "fetched_at": time.monotonic() - nc.NEWS_REFRESH_INTERVAL - 1}
+    monkeypatch.setattr(nc, "_snapshot", stale)
+    request = SimpleNamespace(headers={})
+
+    async def main():
+        responses = [await nc.fetch_ma_news(request) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        # The refresh failed; it is not retried until another interval has passed
+        responses.append(await nc.fetch_ma_news(request))
+        return responses
+
+    responses = run(main())
+    assert all(response.body == b"{}" for response in responses)
+    assert len(failing_newsapi) == 1
+
+
+def test_fresh_feed_makes_no_upstream_call(monkeypatch, failing_newsapi):
+    fresh = {"body": b"[]", "gzip": b"", "etag": '"new"', "fetched_at": time.monotonic()}
+    monkeypatch.setattr(nc, "_snapshot", fresh)
+    response = run(nc.fetch_ma_news(SimpleNamespace(headers={"if-none-match": '"new"'})))
+    assert response.status_code == 304
+    assert failing_newsapi == []
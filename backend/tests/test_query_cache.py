@@ -0,0 +1,75 @@
+import asyncio
+import threading
+
+from conftest import run
+from services import query_cache as qc
+from services.query_cache import MemoryBackend, QueryCache, SqliteBackend
+
+
+def counting_compute(calls, value="v", delay=0.02):
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return f"{value}{len(calls)}"
+
+    return lambda: compute()
+
+
+def test_concurrent_misses_compute_once():
+    cache = QueryCache(MemoryBackend(), ttl=60, stale_ttl=60)
+    calls = []
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_compute("q", counting_compute(calls)) for _ in range(10)))
+
+    assert run(main()) == ["v1"] * 10
+    assert len(calls) == 1
+
+
+def test_stale_entry_is_served_while_one_refresh_runs(monkeypatch):
+    cache = QueryCache(MemoryBackend(), ttl=10, stale_ttl=100)
+    calls = []
+    now = [1000.0]
+    monkeypatch.setattr(qc.time, "time", lambda: now[0])
+
+    async def main():
+        first = await cache.get_or_compute("q", counting_compute(calls))
+        now[0] += 20  # past ttl, within stale_ttl
+        stale = await asyncio.gather(*(cache.get_or_compute("q", counting_compute(calls)) for _ in range(5)))
+        await asyncio.sleep(0.05)
+        fresh = await cache.get_or_compute("q", counting_compute(calls))
+        return first, stale, fresh
+
+    first, stale, fresh = run(main())
+    assert first == "v1" and stale == ["v1"] * 5 and fresh == "v2"
+    assert len(calls) == 2
+
+
+def test_expired_entry_is_recomputed(monkeypatch):
+    cache = QueryCache(MemoryBackend(), ttl=10, stale_ttl=10)
+    calls = []
+    now = [1000.0]
+    monkeypatch.setattr(qc.time, "time", lambda: now[0])
+
+    async def main():
+        await cache.get_or_compute("q", counting_compute(calls))
+        now[0] += 30
+        return await cache.get_or_compute("q", counting_compute(calls))
+
+    assert run(main()) == "v2"
+
+
+def test_sqlite_backend_runs_off_the_event_loop(tmp_path):
+    backend = SqliteBackend(path=str(tmp_path / "cache.sqlite3"))
+    threads = set()
+    get, set_ = backend.get, backend.set
+    backend.get = lambda *args: threads.add(threading.current_thread()) or get(*args)
+    backend.set = lambda *args: threads.add(threading.current_thread()) or set_(*args)
+    cache = QueryCache(backend, ttl=60, stale_ttl=0)
+
+    async def main():
+        await cache.put("a", {"risk_level": 1.5})
+        return await cache.peek("a"), await cache.get_or_compute("b", counting_compute([]))
+
+    assert run(main()) == ({"risk_level": 1.5}, "v1")
+    assert threads and threading.main_thread() not in threads
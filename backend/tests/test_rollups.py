@@ -0,0 +1,163 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import run
+from services import rollups, write_behind
+from services.rollups import RollupWriter
+from services.write_behind import WriteBehindQueue
+
+
+def row(query="Tesla", created_at="2024-06-01T10:15:00", positive=60.0, negative=40.0, risk=2.0, total=10):
+    return {
+        "user_id": 1, "query": query, "created_at": created_at,
+        "positive": positive, "negative": negative, "risk_level": risk, "total_results": total,
+    }
+
+
+class FakeRollupTable:
+    """Answers the rollup select with `stored`, records upserted rows and can hold the upsert open."""
+
+    def __init__(self, stored=(), hold=None):
+        self.stored = list(stored)
+        self.upserts = []
+        self.hold = hold
+
+    async def execute(self, query, name="query", timeout=None):
+        if name.endswith(".upsert"):
+            if self.hold is not None:
+                await self.hold.wait()
+            self.upserts.append(query.json)
+            return SimpleNamespace(data=query.json)
+        return SimpleNamespace(data=self.stored)
+
+
+@pytest.fixture
+def table(monkeypatch):
+    def install(**kwargs):
+        fake = FakeRollupTable(**kwargs)
+        monkeypatch.setattr(rollups, "execute", fake.execute)
+        return fake
+
+    return install
+
+
+def test_rows_fold_into_hour_and_day_buckets_by_cache_key():
+    writer = RollupWriter()
+    writer.add([row(), row(query=" tesla  ", created_at="2024-06-01T10:50:00"), row(created_at="2024-06-01T11:05:00")])
+
+    assert writer.pending_for("1", "tesla", "hour") == {
+        "2024-06-01T10:00:00": (2, 120.0, 80.0, 4.0, 20),
+        "2024-06-01T11:00:00": (1, 60.0, 40.0, 2.0, 10),
+    }
+    assert writer.pending_for("1", "tesla", "day") == {"2024-06-01": (3, 180.0, 120.0, 6.0, 30)}
+    writer.add([row()], sign=-1)
+    assert writer.pending_for("1", "tesla", "day")["2024-06-01"][0] == 2
+
+
+def test_saves_and_deletes_share_a_key_whatever_the_id_type(table):
+    user = uuid.uuid4()
+    saved = {**row(), "user_id": str(user)}
+    deleted = {**row(), "user_id": user}
+    fake = table()
+
+    async def main():
+        writer = RollupWriter()
+        writer.start()
+        writer.add([saved, saved])
+        writer.add([deleted], sign=-1)
+        assert writer.pending_for(str(user), "tesla", "day") == {"2024-06-01": (1, 60.0, 40.0, 2.0, 10)}
+        assert await writer.flush()
+        await writer.stop()
+
+    run(main())
+    keys = [(r["user_id"], r["granularity"], r["bucket"]) for r in fake.upserts[0]]
+    assert len(keys) == len(set(keys)) == 2
+
+
+def test_flush_adds_pending_sums_to_stored_ones(table):
+    stored = {"query_key": "tesla", "bucket": "2024-06-01", "analyses": 4, "positive_sum": 200.0,
+              "negative_sum": 200.0, "risk_sum": 8.0, "volume": 40}
+    fake = table(stored=[stored])
+
+    async def main():
+        writer = RollupWriter()
+        writer.start()
+        writer.add([row()])
+        assert await writer.flush()
+        await writer.stop()
+
+    run(main())
+    upserted = {(r["granularity"], r["bucket"]): r for r in fake.upserts[0]}
+    assert upserted[("day", "2024-06-01")]["analyses"] == 5
+    assert upserted[("day", "2024-06-01")]["volume"] == 50
+    assert upserted[("hour", "2024-06-01T10:00:00")]["analyses"] == 1
+
+
+def test_cancelled_flush_keeps_its_increments(table):
+    table(hold=asyncio.Event())
+
+    async def main():
+        writer = RollupWriter()
+        writer.start()
+        writer.add([row()])
+        flush = asyncio.create_task(writer.flush())
+        await asyncio.sleep(0.01)
+        flush.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await flush
+        return writer
+
+    writer = run(main())
+    assert writer.pending_for("1", "tesla", "day") == {"2024-06-01": (1, 60.0, 40.0, 2.0, 10)}
+
+
+def test_stop_lets_a_running_flush_finish(table):
+    hold = asyncio.Event()
+    fake = table(hold=hold)
+
+    async def main():
+        writer = RollupWriter(flush_interval=0.01)
+        writer.start()
+        writer.add([row()])
+        await asyncio.sleep(0.05)
+        stopping = asyncio.create_task(writer.stop())
+        await asyncio.sleep(0.01)
+        hold.set()
+        await stopping
+        return writer
+
+    writer = run(main())
+    # One upsert, not a second one re-applying the same increments
+    assert len(fake.upserts) == 1
+    assert writer.pending_for("1", "tesla", "day") == {}
+
+
+def test_queued_saves_count_only_once_inserted(monkeypatch):
+    attempts = []
+
+    async def insert(rows, name="query", timeout=None):
+        attempts.append(len(rows))
+        if len(attempts) == 1:
+            raise RuntimeError("insert failed")
+        return SimpleNamespace(data=rows)
+
+    monkeypatch.setattr(write_behind, "execute", insert)
+    monkeypatch.setattr(write_behind, "supabase", SimpleNamespace(table=lambda name: SimpleNamespace(insert=list)))
+
+    async def main():
+        writer = RollupWriter()
+        queue = WriteBehindQueue("analyzed_data", max_retries=0)
+        queue.on_flushed = writer.add
+        queue.start()
+        await queue.enqueue(row())
+        assert not await queue.flush()
+        assert writer.pending_for("1", "tesla", "day") == {}
+        assert await queue.flush()
+        await queue.stop()
+        return writer
+
+    writer = run(main())
+    assert writer.pending_for("1", "tesla", "day") == {"2024-06-01": (1, 60.0, 40.0, 2.0, 10)}
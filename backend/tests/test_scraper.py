@@ -0,0 +1,36 @@
+import asyncio
+import time
+
+import pytest
+
+from conftest import run
+from services import scraper
+
+
+def test_sources_are_scraped_concurrently(fixture_http):
+    started = time.perf_counter()
+    reddit_data, google_data = run(scraper.scrape_all("tesla"))
+    elapsed = time.perf_counter() - started
+
+    assert reddit_data and google_data
+    assert all(" - https://reddit.com/" in item for item in reddit_data)
+    # Each fixture response takes 100ms; sequential fetching would take 200ms+
+    assert elapsed < 0.2
+
+
+def test_slow_or_failing_source_yields_partial_results(fixture_http, monkeypatch):
+    async def hang(query):
+        await asyncio.sleep(10)
+
+    monkeypatch.setitem(scraper.SOURCES, "reddit", (hang, 0.05))
+    reddit_data, google_data = run(scraper.scrape_all("tesla"))
+    assert reddit_data == [] and google_data
+
+
+def test_failing_source_raises_without_partial(monkeypatch):
+    async def fail(query):
+        raise ValueError("upstream down")
+
+    monkeypatch.setitem(scraper.SOURCES, "reddit", (fail, 1))
+    with pytest.raises(ValueError):
+        run(scraper.scrape_source("reddit", "tesla", partial=False))
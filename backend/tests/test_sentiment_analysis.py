@@ -0,0 +1,86 @@
+import numpy as np
+
+
+def test_aggregate_sentiment_counts_percentages_and_risk(fake_model):
+    label_ids = np.array([0, 0, 1, 0], dtype=np.int64)
+    confidences = np.array([0.9, 0.7, 0.99, 0.8])
+
+    counts, percentages, risk = fake_model.aggregate_sentiment(label_ids, confidences)
+
+    assert counts == {"positive": 1, "neutral": 0, "negative": 3}
+    assert percentages == {"positive": 25.0, "neutral": 0.0, "negative": 75.0}
+    # 75% negative * 0.8 + mean negative confidence (0.8) * 0.2
+    assert risk == round(75.0 * 0.8 + 0.8 * 0.2, 2)
+
+
+def test_to_tuples_maps_ids_to_labels(fake_model):
+    pairs = fake_model.to_tuples(np.array([1, 0]), np.array([0.6, 0.9]))
+    assert pairs == [("POSITIVE", 0.6), ("NEGATIVE", 0.9)]
+
+
+def test_result_cache_is_lru_with_ttl(monkeypatch, fake_model):
+    cache = fake_model.SentimentCache(maxsize=2, ttl=10)
+    cache.set("a", ("POSITIVE", 0.9))
+    cache.set("b", ("NEGATIVE", 0.8))
+    assert cache.get("a") == ("POSITIVE", 0.9)
+    cache.set("c", ("NEGATIVE", 0.7))
+    # "b" was least recently used
+    assert cache.get("b") is None and cache.get("a") is not None
+
+    now = fake_model.time.monotonic()
+    monkeypatch.setattr(fake_model.time, "monotonic", lambda: now + 11)
+    assert cache.get("a") is None
+
+
+def test_analyze_batch_arrays_scores_each_uncached_text_once(monkeypatch, fake_model):
+    monkeypatch.setattr(fake_model, "result_cache", fake_model.SentimentCache(maxsize=100))
+    scored = []
+
+    def model_fn(texts, batch_size):
+        scored.append(list(texts))
+        return np.array([1] * len(texts)), np.array([0.75] * len(texts))
+
+    # Same headline modulo case and whitespace is one cache key
+    label_ids, _ = fake_model.analyze_batch_arrays(["Deal closes", "deal  closes", "Stock falls"], model_fn=model_fn)
+    assert scored == [["Deal closes", "Stock falls"]]
+    assert label_ids.tolist() == [1, 1, 1]
+
+    fake_model.analyze_batch_arrays(["DEAL CLOSES", "Stock falls"], model_fn=model_fn)
+    assert len(scored) == 1
+
+
+class WordTokenizer:
+    """One token id per word; pads with 0 like the HF tokenizer."""
+
+    def __call__(self, texts, truncation=True, max_length=128):
+        return {"input_ids": [[1] * min(len(text.split()), max_length) for text in texts]}
+
+    def pad(self, encoded, return_tensors="pt"):
+        import torch
+
+        width = max(len(ids) for ids in encoded["input_ids"])
+        input_ids = torch.tensor([ids + [0] * (width - len(ids)) for ids in encoded["input_ids"]])
+        return {"input_ids": input_ids, "attention_mask": (input_ids != 0).long()}
+
+
+def test_run_model_pads_per_length_bucket_and_keeps_order(monkeypatch, fake_model):
+    import torch
+
+    widths = []
+
+    class LengthRunner:
+        def logits(self, inputs):
+            widths.append(inputs["input_ids"].shape[1])
+            lengths = inputs["attention_mask"].sum(dim=1).float()
+            # Texts with more than 3 words are "positive"
+            return torch.stack([torch.full_like(lengths, 3.5), lengths], dim=1)
+
+    monkeypatch.setattr(fake_model, "tokenizer", WordTokenizer())
+    texts = ["a b c d e f g h", "a", "a b c d e f g", "a b"]
+
+    label_ids, confidences = fake_model.run_model(texts, batch_size=2, runner=LengthRunner())
+
+    # The two short texts share a batch, the two long ones share the other
+    assert sorted(widths) == [2, 8]
+    assert label_ids.tolist() == [1, 0, 1, 0]
+    assert len(confidences) == 4
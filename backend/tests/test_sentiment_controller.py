@@ -0,0 +1,132 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from conftest import run
+from controllers import sentiment_controller as sc
+
+
+async def collect(agen):
+    return [event async for event in agen]
+
+
+def test_stream_emits_scraped_sentiment_then_result(stub_pipeline):
+    events = run(collect(sc.stream_analysis("tesla", None)))
+    kinds = [event["event"] for event in events]
+
+    assert sorted(kinds[:2]) == ["scraped", "scraped"]
+    assert kinds[-1] == "result" and set(kinds[2:-1]) == {"sentiment"}
+
+    result = events[-1]
+    scored = [item["index"] for event in events if event["event"] == "sentiment" for item in event["items"]]
+    # Every analyzed item is reported once, duplicates included
+    assert sorted(scored) == list(range(min(sc.MAX_ANALYZED_ITEMS, len(result["scraped_data"]))))
+    assert sum(result["sentiment_count"].values()) == len(scored)
+    assert result["saved"] is False
+
+
+def test_stream_result_matches_analyze(stub_pipeline):
+    streamed = run(collect(sc.stream_analysis("tesla", None)))[-1]
+    analysis = run(sc.run_analysis("tesla"))
+    for field in ("sentiment_count", "sentiment_percentages", "risk_level", "scraped_data"):
+        assert streamed[field] == analysis[field]
+
+
+def test_cursor_round_trip_and_rejects_filter_injection():
+    row = {"created_at": "2024-06-01T10:15:00.123456", "id": 42}
+    assert sc.decode_cursor(sc.encode_cursor(row)) == ("2024-06-01T10:15:00.123456", "42")
+    uuid_row = {"created_at": "2024-06-01T10:15:00+00:00", "id": "3f2b8c1e-0000-4000-8000-000000000001"}
+    assert sc.decode_cursor(sc.encode_cursor(uuid_row))[1] == uuid_row["id"]
+
+    for bad in (
+        {"created_at": '2024-06-01",user_id.neq."x', "id": 1},
+        {"created_at": "2024-06-01T10:15:00", "id": "1),or(user_id.neq.x"},
+    ):
+        with pytest.raises(HTTPException) as error:
+            sc.decode_cursor(sc.encode_cursor(bad))
+        assert error.value.status_code == 400
+    with pytest.raises(HTTPException):
+        sc.decode_cursor("not-base64-json")
+
+
+def test_history_rejects_malformed_date_bounds(monkeypatch, fake_execute):
+    monkeypatch.setattr(sc, "execute", fake_execute)
+    request = SimpleNamespace(state=SimpleNamespace(user="u1"), headers={})
+    for start, end in (("yesterday", None), (None, "2024-13-01"), ("2024-06-01,user_id.neq.x", None)):
+        with pytest.raises(HTTPException) as error:
+            run(sc.get_user_analysis(request, limit=10, cursor=None, start=start, end=end, query=None))
+        assert error.value.status_code == 400
+    assert fake_execute.calls == []
+
+    fake_execute.responses["analyzed_data.select_page"] = [{"id": 1, "created_at": "2024-06-01T10:00:00"}]
+    run(sc.get_user_analysis(request, limit=10, cursor=None, start="2024-06-01", end="2024-06-30T23:59:59", query=None))
+    params = fake_execute.calls[-1][1]
+    assert ("created_at", "gte.2024-06-01T00:00:00") in params.multi_items()
+    assert ("created_at", "lte.2024-06-30T23:59:59") in params.multi_items()
+
+
+def test_query_filter_escapes_like_wildcards():
+    assert sc.ilike_exact("Tesla") == "Tesla"
+    assert sc.ilike_exact(r"100%_deal\\") == r"100\%\_deal\\\\"
+
+
+def test_history_page_is_keyset_paginated(monkeypatch, fake_execute):
+    rows = [{"id": i, "created_at": f"2024-06-01T10:{i:02d}:00"} for i in range(5, 0, -1)]
+    fake_execute.responses["analyzed_data.select_page"] = rows[:3]
+    monkeypatch.setattr(sc, "execute", fake_execute)
+    request = SimpleNamespace(state=SimpleNamespace(user="u1"), headers={})
+
+    response = run(sc.get_user_analysis(request, limit=2, cursor=None, start=None, end=None, query="50%"))
+    body = json.loads(response.body)
+    assert [row["id"] for row in body["data"]] == [5, 4]
+    assert sc.decode_cursor(body["next_cursor"]) == ("2024-06-01T10:04:00", "4")
+
+    params = dict(fake_execute.calls[-1][1])
+    assert params["limit"] == "3" and params["query"] == r"ilike.50\%"
+
+    etag = response.headers["etag"]
+    request.headers = {"if-none-match": etag}
+    cached = run(sc.get_user_analysis(request, limit=2, cursor=None, start=None, end=None, query="50%"))
+    assert cached.status_code == 304
+
+
+class JsonRequest:
+    def __init__(self, body, user=None):
+        self._body = body
+        self.state = SimpleNamespace(user=user)
+        self.headers = {}
+
+    async def json(self):
+        return self._body
+
+
+def test_batch_scores_all_queries_together_and_saves_once(monkeypatch, stub_pipeline, fake_execute):
+    fake_execute.responses["analyzed_data.insert"] = lambda query: [{}]
+    monkeypatch.setattr(sc, "execute", fake_execute)
+
+    request = JsonRequest({"queries": ["Tesla", " tesla ", "", "Apple", 7]}, user="u1")
+    body = json.loads(run(sc.analyze_sentiment_batch(request)).body)
+
+    assert [result["query"] for result in body["results"]] == ["Tesla", "Apple"]
+    assert all(result["saved"] for result in body["results"])
+    # One model submission with the texts of both queries, and one insert for both rows
+    assert len(stub_pipeline.submitted) == 1
+    assert body["model_texts"] == len(stub_pipeline.submitted[0])
+    assert fake_execute.names() == ["analyzed_data.insert"]
+
+    tesla = body["results"][0]
+    alone = run(sc.run_analysis("Tesla"))
+    assert tesla["sentiment_count"] == alone["sentiment_count"]
+
+
+def test_batch_rejects_empty_and_oversized_lists(monkeypatch):
+    for body in ({}, {"queries": []}, {"queries": ["  ", None]}):
+        with pytest.raises(HTTPException) as error:
+            run(sc.analyze_sentiment_batch(JsonRequest(body)))
+        assert error.value.status_code == 422
+    monkeypatch.setattr(sc, "BATCH_MAX_QUERIES", 1)
+    with pytest.raises(HTTPException) as error:
+        run(sc.analyze_sentiment_batch(JsonRequest({"queries": ["a", "b"]})))
+    assert error.value.status_code == 400
@@ -0,0 +1,89 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import run
+from controllers import sentiment_controller, tracking_controller as tc
+from services.tracking_store import TrackedItemStore
+
+
+def test_snapshot_memo_picks_up_writes_from_other_processes(tmp_path):
+    path = str(tmp_path / "tracking.sqlite3")
+    reader, writer = TrackedItemStore(path, recheck=0), TrackedItemStore(path)
+    patient = TrackedItemStore(path, recheck=60)
+
+    writer.set_snapshot("tesla", {"risk_level": 1})
+    assert run(reader.fresh_analysis("tesla")) == {"risk_level": 1}
+    assert patient.get_snapshot("tesla")[0] == {"risk_level": 1}
+
+    writer.set_snapshot("tesla", {"risk_level": 2})
+    assert run(reader.fresh_analysis("tesla")) == {"risk_level": 2}
+    # Within the re-check interval the memo is served as is
+    assert patient.get_snapshot("tesla")[0] == {"risk_level": 1}
+
+    writer.forget("tesla")
+    assert run(reader.fresh_analysis("tesla")) is None
+
+
+def test_misses_are_remembered_for_the_recheck_interval(monkeypatch, tmp_path):
+    path = str(tmp_path / "tracking.sqlite3")
+    reader, writer = TrackedItemStore(path, recheck=60), TrackedItemStore(path)
+    loads = []
+    load = reader._load_snapshot
+    monkeypatch.setattr(reader, "_load_snapshot", lambda key: loads.append(key) or load(key))
+
+    for _ in range(5):
+        assert run(reader.fresh_analysis("untracked")) is None
+    assert loads == ["untracked"]
+
+    # Tracking it in this process takes effect at once; elsewhere, after the interval
+    reader.set_snapshot("untracked", {"risk_level": 1})
+    assert run(reader.fresh_analysis("untracked")) == {"risk_level": 1}
+    assert run(reader.fresh_analysis("other")) is None
+    writer.set_snapshot("other", {"risk_level": 2})
+    assert run(reader.fresh_analysis("other")) is None
+    reader.recheck = 0
+    assert run(reader.fresh_analysis("other")) == {"risk_level": 2}
+
+
+def test_old_snapshots_are_not_fresh(tmp_path):
+    store = TrackedItemStore(str(tmp_path / "tracking.sqlite3"))
+    store.set_snapshot("tesla", {"risk_level": 1}, refreshed_at=time.time() - 10 ** 6)
+    assert run(store.fresh_analysis("tesla")) is None
+    assert store.get_snapshot("tesla") is not None
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    store = TrackedItemStore(str(tmp_path / "tracking.sqlite3"))
+    monkeypatch.setattr(tc, "tracking_store", store)
+    monkeypatch.setattr(sentiment_controller, "tracking_store", store)
+    return store
+
+
+def test_refresh_scores_only_new_items(monkeypatch, stub_pipeline, store):
+    monkeypatch.setattr(tc, "batcher", stub_pipeline)
+
+    first = run(tc.refresh_tracked_query("tesla"))
+    assert len(stub_pipeline.submitted) == 1
+    second = run(tc.refresh_tracked_query("Tesla "))
+    assert len(stub_pipeline.submitted) == 1
+    assert second["sentiment_count"] == first["sentiment_count"]
+
+    # /api/analyze answers from the snapshot without scraping or scoring
+    monkeypatch.setattr(sentiment_controller, "scrape_all", lambda query: pytest.fail("scraped a tracked query"))
+    assert run(sentiment_controller.run_batch_analysis(["TESLA"]))[1] == 0
+
+
+def test_tracked_list_reports_refreshed_at_in_ist(monkeypatch, store, fake_execute):
+    store.set_snapshot("tesla", {"risk_level": 3, "sentiment_percentages": {}}, refreshed_at=1)
+    fake_execute.responses["tracked_queries.select"] = [
+        {"id": 1, "query": "Tesla", "created_at": "2024-06-01T10:00:00"},
+        {"id": 2, "query": "Apple", "created_at": "2024-06-01T11:00:00"},
+    ]
+    monkeypatch.setattr(tc, "execute", fake_execute)
+
+    data = run(tc.get_tracked(SimpleNamespace(state=SimpleNamespace(user="u1"))))["data"]
+    assert data[0]["refreshed_at"] == "1970-01-01T05:30:01" and data[0]["risk_level"] == 3
+    assert data[1]["refreshed_at"] is None
@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import run
+from controllers import user_controller as uc
+from services.query_cache import MemoryBackend, QueryCache
+from services.user_cache import BloomFilter, EmailFilter
+
+
+@pytest.fixture
+def users(monkeypatch, fake_execute):
+    """A users table holding one address, behind a freshly built email filter and profile cache."""
+    emails = {"known@example.com"}
+    fake_execute.responses["users.select_emails"] = lambda query: [{"email": email} for email in sorted(emails)]
+    fake_execute.responses["users.select_email"] = lambda query: (
+        [{"email": query.params["email"][3:]}] if query.params["email"][3:] in emails else []
+    )
+
+    def insert(query):
+        emails.add(query.json["email"])
+        return [{"id": 7, **query.json}]
+
+    fake_execute.responses["users.insert"] = insert
+
+    async def fake_hash(password):
+        return f"hashed:{password}"
+
+    email_filter = EmailFilter()
+    profiles = QueryCache(MemoryBackend(maxsize=10), ttl=60, stale_ttl=0)
+    for module in ("controllers.user_controller", "services.user_cache"):
+        monkeypatch.setattr(f"{module}.execute", fake_execute)
+    monkeypatch.setattr(uc, "email_filter", email_filter)
+    monkeypatch.setattr(uc, "profile_cache", profiles)
+    monkeypatch.setattr(uc, "hash_password", fake_hash)
+    run(email_filter.rebuild())
+    return fake_execute
+
+
+def check(email):
+    return run(uc.check_email(uc.CheckEmailRequest(email=email)))["exists"]
+
+
+def test_filter_miss_skips_the_users_query(users):
+    assert not check("nobody@example.com")
+    assert "users.select_email" not in users.names()
+
+    assert check("known@example.com")
+    assert users.names().count("users.select_email") == 1
+
+
+def test_registered_email_exists_immediately(users):
+    request = SimpleNamespace(headers={"user-agent": "pytest"}, client=SimpleNamespace(host="127.0.0.1"))
+    body = uc.RegisterRequest(email="new@example.com", fullName="New User", password="secret")
+    assert run(uc.register(body, request))["token"]
+
+    # No filter sync has run since the build, yet the new address is found
+    assert check("new@example.com")
+
+    # The profile was cached on registration, so /me needs no users query
+    calls = len(users.calls)
+    response = run(uc.get_user_data(SimpleNamespace(state=SimpleNamespace(user="7"))))
+    assert b"New User" in response.body and len(users.calls) == calls
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(500, fp_rate=0.01)
+    emails = [f"user{i}@example.com" for i in range(500)]
+    for email in emails:
+        bloom.add(email)
+    assert all(email in bloom for email in emails)
+    false_positives = sum(f"other{i}@example.com" in bloom for i in range(2000))
+    assert false_positives < 100
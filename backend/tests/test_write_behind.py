@@ -0,0 +1,139 @@
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import run
+from services import write_behind
+from services.write_behind import WriteBehindQueue
+
+
+class FakeTable:
+    """Records bulk inserts; `fail` failures first, and optionally hangs on the first attempt."""
+
+    def __init__(self, fail=0, block=False):
+        self.inserted = []
+        self.attempts = 0
+        self.fail = fail
+        self.block = block
+
+    async def execute(self, rows, name="query", timeout=None):
+        self.attempts += 1
+        if self.block and self.attempts == 1:
+            await asyncio.Event().wait()
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("insert failed")
+        self.inserted.append(list(rows))
+        return SimpleNamespace(data=rows)
+
+
+@pytest.fixture
+def fake_table(monkeypatch):
+    def install(**kwargs):
+        table = FakeTable(**kwargs)
+        monkeypatch.setattr(write_behind, "execute", table.execute)
+        monkeypatch.setattr(write_behind, "supabase", SimpleNamespace(table=lambda name: SimpleNamespace(insert=list)))
+        return table
+
+    return install
+
+
+def rows(n, start=0):
+    return [{"id": i} for i in range(start, start + n)]
+
+
+def test_rows_are_written_in_bulk_batches(fake_table):
+    table = fake_table()
+
+    async def main():
+        queue = WriteBehindQueue("analyzed_data", batch_size=50, flush_interval=0.01)
+        queue.start()
+        for row in rows(120):
+            await queue.enqueue(row)
+        await asyncio.sleep(0.1)
+        await queue.stop()
+
+    run(main())
+    assert [len(batch) for batch in table.inserted] == [50, 50, 20]
+
+
+def test_failed_inserts_are_retried(fake_table, monkeypatch):
+    table = fake_table(fail=2)
+    monkeypatch.setattr(write_behind.asyncio, "sleep", _no_sleep(asyncio.sleep))
+
+    async def main():
+        queue = WriteBehindQueue("analyzed_data", batch_size=10, max_retries=3)
+        queue._flush_lock = asyncio.Lock()
+        for row in rows(5):
+            await queue.enqueue(row)
+        return await queue.flush()
+
+    assert run(main()) is True
+    assert table.attempts == 3 and table.inserted == [rows(5)]
+
+
+def test_batch_in_flight_at_shutdown_is_not_lost(fake_table, tmp_path):
+    table = fake_table(block=True)
+    spool = tmp_path / "spool.jsonl"
+
+    async def main():
+        queue = WriteBehindQueue("analyzed_data", batch_size=10, flush_interval=0.01, spool_path=str(spool))
+        queue.start()
+        for row in rows(5):
+            await queue.enqueue(row)
+        # Let the worker take the batch and hang inside the insert, then shut down
+        await asyncio.sleep(0.05)
+        assert table.attempts == 1 and not queue._pending
+        await queue.stop()
+
+    run(main())
+    assert rows(5) in table.inserted
+    assert spool.read_text() == ""
+
+
+def test_spooled_rows_are_replayed_on_start(fake_table, tmp_path):
+    spool = tmp_path / "spool.jsonl"
+    spool.write_text("".join(json.dumps(row) + "\n" for row in rows(3)))
+    table = fake_table()
+
+    async def main():
+        queue = WriteBehindQueue("analyzed_data", flush_interval=0.01, spool_path=str(spool))
+        queue.start()
+        await asyncio.sleep(0.05)
+        await queue.stop()
+
+    run(main())
+    assert table.inserted == [rows(3)]
+    assert spool.read_text() == ""
+
+
+def test_spool_appends_are_batched_off_the_event_loop(tmp_path):
+    spool = tmp_path / "spool.jsonl"
+    queue = WriteBehindQueue("analyzed_data", spool_path=str(spool))
+    appends = []
+    append = queue._append_spool
+
+    def traced_append(batch):
+        appends.append((threading.current_thread() is threading.main_thread(), len(batch)))
+        append(batch)
+
+    queue._append_spool = traced_append
+
+    async def main():
+        await asyncio.gather(*(queue.enqueue(row) for row in rows(20)))
+
+    run(main())
+    assert [json.loads(line) for line in spool.read_text().splitlines()] == rows(20)
+    assert not any(on_loop for on_loop, _ in appends)
+    # The first append runs alone; everything queued behind it goes in one more
+    assert sum(size for _, size in appends) == 20 and len(appends) < 20
+
+
+def _no_sleep(real_sleep):
+    async def sleep(seconds):
+        await real_sleep(0)
+
+    return sleep